@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts.
+
+The integration's ``__init__`` pulls in Home Assistant, so modules are loaded
+through a bare package object instead of importing ``custom_components``.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PKG_DIR = ROOT / "custom_components" / "pl_package_tracker"
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def register() -> None:
+    """Make ``pl_package_tracker`` importable without running its __init__."""
+    if "pl_package_tracker" not in sys.modules:
+        pkg = types.ModuleType("pl_package_tracker")
+        pkg.__path__ = [str(PKG_DIR)]
+        sys.modules["pl_package_tracker"] = pkg
+
+
+def load(module: str):
+    """Import ``pl_package_tracker.<module>``."""
+    register()
+    return importlib.import_module(f"pl_package_tracker.{module}")
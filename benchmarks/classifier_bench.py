@@ -0,0 +1,73 @@
+"""Correctness and speed of the status classifier.
+
+    python benchmarks/classifier_bench.py [--iterations N]
+
+Every entry in fixtures/status_corpus.json must classify to its expected short
+state (exit code 1 otherwise); then the classifier is timed against the old
+per-call keyword scan for comparison.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+
+from _common import FIXTURES, load
+
+classifier = load("classifier")
+
+
+def legacy_short_from_detail(detail: str) -> str:
+    """The pre-classifier implementation, kept here only as a baseline."""
+    t = detail.lower()
+    if any(k in t for k in ["delivered", "doręczono", "odebrano", "dostarczono",
+                            "przesyłka doręczona do odbiorcy",
+                            "the shipment has been successfully delivered"]):
+        return "Delivered"
+    if any(k in t for k in ["out_for_delivery", "w doręczeniu", "kurier w drodze",
+                            "dzisiaj doręczenie", "przekazano do doręczenia", "in delivery",
+                            "przesyłka przekazana kurierowi do doręczenia",
+                            "the shipment has been loaded onto the delivery vehicle"]):
+        return "In delivery Today"
+    if any(k in t for k in ["created", "confirmed", "utworzono", "przygotowana przez nadawcę",
+                            "zarejestrowano", "nadanie zarejestrowane",
+                            "przesyłka przyjęta w terminalu nadawczym dhl"]):
+        return "Label created"
+    return "In transit"
+
+
+def classify(entry: dict) -> str:
+    if entry["carrier"] == "inpost":
+        return classifier.short_from_inpost(entry.get("status_code"), entry["detail"])
+    return classifier.short_from_detail(entry["detail"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = json.loads((FIXTURES / "status_corpus.json").read_text(encoding="utf-8"))
+
+    failures = [(e, classify(e)) for e in corpus if classify(e) != e["short"]]
+    for entry, got in failures:
+        print(f"MISMATCH {entry['carrier']} {entry['detail']!r}: expected {entry['short']!r}, got {got!r}")
+    print(f"corpus: {len(corpus) - len(failures)}/{len(corpus)} correct")
+
+    details = [e["detail"] for e in corpus]
+    calls = len(details) * args.iterations
+    for name, func in (
+        ("legacy keyword scan", lambda: [legacy_short_from_detail(d) for d in details]),
+        ("short_from_detail (uncached)", lambda: [classifier.short_from_detail.__wrapped__(d) for d in details]),
+        ("short_from_detail", lambda: [classifier.short_from_detail(d) for d in details]),
+        ("classify (code table first)", lambda: [classify(e) for e in corpus]),
+    ):
+        seconds = min(timeit.repeat(func, number=args.iterations, repeat=3))
+        print(f"{name:30s} {seconds / calls * 1e9:8.0f} ns/call")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
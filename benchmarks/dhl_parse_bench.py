@@ -0,0 +1,124 @@
+"""Status extraction from rendered DHL tracking pages.
+
+    python benchmarks/dhl_parse_bench.py [--pad-kb 400] [--iterations 50]
+
+Runs dhl_scraper.extract_status over the saved pages in fixtures/dhl_pages
+(checking each against expected.json; exit code 1 on a mismatch) and reports,
+per page, the time and memory allocated per extraction. The fixtures are
+trimmed; ``--pad-kb`` pads each one with repeated navigation markup ahead of
+the result to approximate the size of a real rendered page. If BeautifulSoup
+is installed, the previous full-document parse is measured as a baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+
+from _common import FIXTURES, load
+
+scraper = load("dhl_scraper")
+
+PAGES = FIXTURES / "dhl_pages"
+PAD_BLOCK = """<div class="c-product-teaser"><a class="c-product-teaser--link" href="/pl-pl/home/produkty/{i}.html">
+<img class="c-product-teaser--image" src="/content/dam/dhl/teaser-{i}.jpg" alt="Produkt {i}">
+<h3 class="c-product-teaser--title">DHL Parcel {i}</h3><p class="c-product-teaser--copy">Wyślij paczkę w Polsce i za granicę,
+szybko i wygodnie. Sprawdź ceny i terminy doręczenia.</p></a></div>
+"""
+
+
+def legacy_parse(text: str) -> str:
+    """The BeautifulSoup parse the worker used before, kept here only as a baseline."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(text, "html.parser")
+    status_text = ""
+    date_text = ""
+    status_element = soup.select_one(".c-tracking-result--status-copy-message")
+    if status_element:
+        status_text = status_element.get_text(" ", strip=True).strip()
+        status_text = re.sub(r",\s*Kod nadania przesyłki:.*$", "", status_text)
+        date_element = soup.select_one(".c-tracking-result--status-copy-date")
+        if date_element:
+            date_text = date_element.get_text(" ", strip=True).strip()
+    if not status_text:
+        for element in soup.select(".tracking-status, .status-text, .shipment-status"):
+            status_text = element.get_text(" ", strip=True).strip()
+            if status_text:
+                break
+    if not status_text:
+        patterns = [
+            r"(Doręczono|W doręczeniu|W tranzycie|Nadanie|Przesyłka w drodze)",
+            r"(przesyłka doręczona do odbiorcy|the shipment has been successfully delivered)",
+            r"(przesyłka jest obsługiwana w centrum sortowania|the shipment has been processed in the parcel center)",
+            r"(przesyłka przekazana kurierowi do doręczenia|the shipment has been loaded onto the delivery vehicle)",
+            r"(przesyłka przyjęta w terminalu nadawczym dhl)",
+            r"(Delivered|Out for delivery|In transit|Shipment picked up)",
+            r"Status:?\s*([^<>\n]+)",
+        ]
+        for pattern in patterns:
+            m = re.search(pattern, text, re.I)
+            if m:
+                status_text = m.group(1)
+                break
+    if not status_text:
+        status_text = "Unknown / parsing failed"
+    return f"{status_text} ({date_text})" if date_text else status_text
+
+
+def pad(html: str, kb: int) -> str:
+    blocks, size, i = [], 0, 0
+    while size < kb * 1024:
+        block = PAD_BLOCK.format(i=i)
+        blocks.append(block)
+        size += len(block.encode())
+        i += 1
+    return html.replace('<main class="l-main">', '<main class="l-main">\n' + "".join(blocks), 1)
+
+
+def measure(func, html: str, iterations: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(html)
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    func(html)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 3), "peak_alloc_kb": round((peak - before) / 1024, 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pad-kb", type=int, default=400)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        baseline = True
+    except ImportError:
+        baseline = False
+
+    expected = json.loads((PAGES / "expected.json").read_text(encoding="utf-8"))
+    failures = 0
+    for name, want in expected.items():
+        html = pad((PAGES / name).read_text(encoding="utf-8"), args.pad_kb)
+        got = scraper.extract_status(html)
+        if got != want:
+            failures += 1
+            print(f"MISMATCH {name}: {got!r} != {want!r}", file=sys.stderr)
+        row = {"page": name, "size_kb": round(len(html.encode()) / 1024), "extract": measure(scraper.extract_status, html, args.iterations)}
+        if baseline:
+            row["legacy_bs4"] = measure(legacy_parse, html, max(1, args.iterations // 10))
+        print(json.dumps(row))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
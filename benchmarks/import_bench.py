@@ -0,0 +1,135 @@
+"""Import and setup cost of the integration.
+
+    python benchmarks/import_bench.py [--module api] [--runs 5] [--root PATH] [--packages 10]
+
+Two measurements, each in a fresh interpreter so nothing is cached:
+
+  import_us   best cumulative ``-X importtime`` of ``pl_package_tracker.<module>``,
+              plus whether the browser stack (selenium, webdriver_manager, bs4)
+              was pulled in
+  setup_ms    best wall time from adding a config entry (``--packages`` InPost
+              packages) to it being loaded, through Home Assistant's own loader
+              and config entry setup, import of the integration included; the
+              ``webhook`` / ``http`` dependencies are marked as set up, so no
+              HTTP server is started
+
+``--root`` points at another checkout of the repository, so the same script
+can measure two commits (``git worktree add /tmp/before <commit>``). Needs
+Home Assistant installed; the carrier requests of the background refresh
+started by setup are cut off when the instance is stopped.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY = ("selenium", "webdriver_manager", "bs4")
+
+IMPORT_SNIPPET = """
+import sys, types
+pkg = types.ModuleType("pl_package_tracker")
+pkg.__path__ = [{pkg_dir!r}]
+sys.modules["pl_package_tracker"] = pkg
+import pl_package_tracker.{module}
+print("LOADED", ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+SETUP_SNIPPET = """
+import asyncio, logging, os, sys, tempfile, time
+logging.disable(logging.CRITICAL)
+
+async def main():
+    from homeassistant import config_entries, loader
+    from homeassistant.config_entries import ConfigEntryState
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers import area_registry, device_registry, entity, entity_registry
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink({components_dir!r}, os.path.join(config_dir, "custom_components"))
+        hass = HomeAssistant(config_dir)
+        hass.config.skip_pip = True
+        loader.async_setup(hass)
+        entity.async_setup(hass)
+        await area_registry.async_load(hass)
+        await device_registry.async_load(hass)
+        await entity_registry.async_load(hass)
+        hass.config_entries = config_entries.ConfigEntries(hass, {{}})
+        await hass.config_entries.async_initialize()
+        # Webhooks only need their handler registry; no HTTP server for a benchmark
+        hass.config.components.update({{"http", "webhook"}})
+
+        packages = {{
+            f"{{i:024d}}": {{"carrier": "inpost", "number": f"{{i:024d}}", "name": ""}} for i in range({packages})
+        }}
+        entry = config_entries.ConfigEntry(
+            version=1, minor_version=1, domain="pl_package_tracker", title="bench", data={{}},
+            source="user", options={{"packages": packages}},
+        )
+        start = time.perf_counter()
+        await hass.config_entries.async_add(entry)
+        elapsed = time.perf_counter() - start
+        assert entry.state is ConfigEntryState.LOADED, entry.state
+        print("SETUP", round(elapsed * 1000, 1), ",".join(m for m in {heavy!r} if m in sys.modules))
+        await hass.async_stop(force=True)
+
+asyncio.run(main())
+"""
+
+
+def _loaded(line: str) -> list[str]:
+    return [m for m in line.split(",") if m]
+
+
+def import_once(root: Path, module: str) -> tuple[int, list[str]]:
+    pkg_dir = str(root / "custom_components" / "pl_package_tracker")
+    code = IMPORT_SNIPPET.format(pkg_dir=pkg_dir, module=module, heavy=HEAVY)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    target = f"pl_package_tracker.{module}"
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(.*)$", line)
+        if m and m.group(2).strip() == target:
+            cumulative = int(m.group(1))
+    loaded = proc.stdout.strip().removeprefix("LOADED").strip()
+    return cumulative, _loaded(loaded)
+
+
+def setup_once(root: Path, packages: int) -> tuple[float, list[str]]:
+    code = SETUP_SNIPPET.format(components_dir=str(root / "custom_components"), packages=packages, heavy=HEAVY)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    line = next(line for line in proc.stdout.splitlines() if line.startswith("SETUP"))
+    _, ms, *loaded = line.split(" ")
+    return float(ms), _loaded(loaded[0] if loaded else "")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="api")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--root", type=Path, default=Path(__file__).resolve().parent.parent,
+                        help="repository checkout to measure")
+    parser.add_argument("--packages", type=int, default=10)
+    args = parser.parse_args()
+
+    imports = [import_once(args.root, args.module) for _ in range(args.runs)]
+    setups = [setup_once(args.root, args.packages) for _ in range(args.runs)]
+    result = {
+        "module": args.module,
+        "import_us": min(us for us, _ in imports),
+        "heavy_modules_loaded": imports[0][1],
+        "setup_ms": min(ms for ms, _ in setups),
+        "heavy_modules_loaded_by_setup": setups[0][1],
+    }
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
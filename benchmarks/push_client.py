@@ -0,0 +1,51 @@
+"""Replays recorded InPost (ShipX) status callbacks against the integration's webhook.
+
+    python benchmarks/push_client.py <webhook url> [--number 5201...] [--fixture path] [--delay-s 1]
+
+The webhook URL is shown in the integration's Options -> Settings. Each event
+is POSTed on its own, like ShipX does; ``--number`` rewrites the tracking
+number so the events hit a package you actually track. Prints the HTTP status
+and round-trip time of every post.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import aiohttp
+
+from _common import FIXTURES
+
+
+async def replay(url: str, events: list, number: str | None, delay: float) -> None:
+    async with aiohttp.ClientSession() as session:
+        for event in events:
+            if number:
+                event["payload"]["tracking_number"] = number
+            start = time.perf_counter()
+            async with session.post(url, json=event) as resp:
+                await resp.read()
+            ms = (time.perf_counter() - start) * 1000
+            print(json.dumps({"status": event["payload"]["status"], "http": resp.status, "ms": round(ms, 1)}))
+            await asyncio.sleep(delay)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url")
+    parser.add_argument("--number", help="tracking number to put into every event")
+    parser.add_argument("--fixture", default=str(FIXTURES / "inpost_push.json"))
+    parser.add_argument("--delay-s", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        events = json.load(f)
+    asyncio.run(replay(args.url, events, args.number, args.delay_s))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Recorder write volume of the per-package entities, old attribute layout vs current.
+
+    python benchmarks/recorder_bench.py [--packages 300] [--changes-per-day 4]
+                                        [--state-row-bytes 100] [--attrs-row-bytes 40]
+
+Replays a day of status changes through the package entities the way Home
+Assistant's state machine and recorder treat them: a write with the same state
+and attributes is dropped, every other write adds a ``states`` row, and a set of
+recorded attributes not seen before adds a ``state_attributes`` row (identical
+sets are shared). The current layout comes from the real sensor classes
+(Home Assistant must be installed); the old one is kept here as a baseline.
+
+Row sizes are payload bytes (state text, attribute JSON) plus a fixed per-row
+overhead for ids, timestamps, context and index entries, so the totals are
+estimates of what SQLite writes, not exact file growth.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from homeassistant.helpers.json import json_bytes
+
+from _common import load
+
+JOURNEY = (
+    "Przesyłka przyjęta w terminalu nadawczym DHL",
+    "Przesyłka jest obsługiwana w centrum sortowania",
+    "Przesyłka opuściła centrum sortowania",
+    "Przesyłka przekazana kurierowi do doręczenia",
+    "Przesyłka doręczona do odbiorcy",
+)
+
+
+def legacy_entities(pkg: dict, data: dict) -> list[tuple[str, dict, frozenset]]:
+    """(state, attributes, unrecorded) per entity, as the sensors wrote them before."""
+    name = pkg["name"] or pkg["number"]
+    attrs = {
+        "carrier": pkg["carrier"],
+        "tracking_number": pkg["number"],
+        "detail": data["detail"],
+        "source": data["source"],
+        "restored": False,
+    }
+    detail_attrs = {**attrs, "friendly_name": f"{name} – detailed status", "icon": "mdi:package-variant-closed"}
+    short_attrs = {**attrs, "friendly_name": f"{name} – status", "icon": "mdi:package-variant"}
+    return [(data["detail"], detail_attrs, frozenset()), (data["short"], short_attrs, frozenset())]
+
+
+def current_entities(sensor, coordinator, entry, pkg: dict) -> list:
+    return [cls(coordinator, entry, pkg) for cls in (
+        sensor.PackageDetailSensor, sensor.PackageShortSensor, sensor.PackageLastChangeSensor,
+    )]
+
+
+def current_state(entity) -> tuple[str, dict, frozenset]:
+    value = entity.native_value
+    attrs = {**entity.extra_state_attributes, "friendly_name": entity.name, "icon": entity.icon}
+    if entity.device_class:
+        attrs["device_class"] = entity.device_class
+    state = value.isoformat() if isinstance(value, datetime) else value
+    return state, attrs, entity._unrecorded_attributes  # noqa: SLF001
+
+
+class RecorderModel:
+    def __init__(self, state_row_bytes: int, attrs_row_bytes: int) -> None:
+        self.state_row_bytes = state_row_bytes
+        self.attrs_row_bytes = attrs_row_bytes
+        self._last: dict[str, tuple] = {}
+        self._shared: set[bytes] = set()
+        self.state_rows = 0
+        self.attrs_rows = 0
+        self.bytes = 0
+
+    def write(self, entity_id: str, state: str, attrs: dict, unrecorded: frozenset) -> None:
+        if self._last.get(entity_id) == (state, attrs):
+            return
+        self._last[entity_id] = (state, attrs)
+        self.state_rows += 1
+        self.bytes += self.state_row_bytes + len(str(state).encode())
+        shared = json_bytes({k: v for k, v in attrs.items() if k not in unrecorded})
+        if shared not in self._shared:
+            self._shared.add(shared)
+            self.attrs_rows += 1
+            self.bytes += self.attrs_row_bytes + len(shared)
+
+    def reset_counters(self) -> None:
+        """Start counting afresh, keeping the last states and known attribute sets."""
+        self.state_rows = self.attrs_rows = self.bytes = 0
+
+
+def run(packages: int, changes: int, state_row_bytes: int, attrs_row_bytes: int) -> list[dict]:
+    classifier = load("classifier")
+    scheduler_mod = load("scheduler")
+    sensor = load("sensor")
+
+    pkgs = [{"carrier": "dhl", "number": f"JJD{i:020d}", "name": ""} for i in range(packages)]
+    coordinator = SimpleNamespace(data={}, scheduler=scheduler_mod.PollScheduler())
+    entry = SimpleNamespace(entry_id="bench")
+    entities = {p["number"]: current_entities(sensor, coordinator, entry, p) for p in pkgs}
+    legacy = RecorderModel(state_row_bytes, attrs_row_bytes)
+    current = RecorderModel(state_row_bytes, attrs_row_bytes)
+
+    start = datetime(2024, 5, 6, 6, tzinfo=timezone.utc)
+    # The first pass puts every package on its first status; only the changes after it are the day's writes
+    for step in range(changes + 1):
+        now = start + timedelta(minutes=step * 720 // max(changes, 1))
+        for i, pkg in enumerate(pkgs):
+            text = JOURNEY[(i + step) % len(JOURNEY)]
+            detail = f"{text} ({now:%Y-%m-%d %H:%M})"
+            data = {"carrier": "dhl", "number": pkg["number"], "detail": detail, "source": "http",
+                    "short": classifier.short_from_detail(detail), "last_update": now.isoformat()}
+            coordinator.data[pkg["number"]] = data
+            coordinator.scheduler.record(pkg["number"], data, now)
+            for n, written in enumerate(legacy_entities(pkg, data)):
+                legacy.write(f"{pkg['number']}_{n}", *written)
+            for n, entity in enumerate(entities[pkg["number"]]):
+                current.write(f"{pkg['number']}_{n}", *current_state(entity))
+        if step == 0:
+            legacy.reset_counters()
+            current.reset_counters()
+
+    return [
+        {"layout": layout, "packages": packages, "changes_per_day": changes, "state_rows": model.state_rows,
+         "attrs_rows": model.attrs_rows, "kb_per_day": round(model.bytes / 1024, 1)}
+        for layout, model in (("legacy", legacy), ("current", current))
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=300)
+    parser.add_argument("--changes-per-day", type=int, default=4)
+    parser.add_argument("--state-row-bytes", type=int, default=100, help="assumed fixed size of a states row")
+    parser.add_argument("--attrs-row-bytes", type=int, default=40, help="assumed fixed size of an attributes row")
+    args = parser.parse_args()
+
+    for row in run(args.packages, args.changes_per_day, args.state_row_bytes, args.attrs_row_bytes):
+        print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
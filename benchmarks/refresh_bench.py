@@ -0,0 +1,150 @@
+"""End-to-end refresh benchmark for PackageDataCoordinator.
+
+    python benchmarks/refresh_bench.py [--sizes 10 100 1000] [--latency-ms 50] [--error-rate 0]
+                                       [--no-etag] [--output results.json]
+
+Starts the stub carrier server, points the integration's carrier URLs at it and
+runs coordinator refreshes against a throwaway Home Assistant instance (Home
+Assistant must be installed). For every package count it reports, as JSON:
+
+  wall_s            wall time of the refresh
+  loop_block_max_ms longest event-loop stall seen by a 5 ms heartbeat
+  peak_rss_mb       peak RSS of the process so far
+  requests          carrier requests served during the refresh
+  not_modified      of those, answered with 304 Not Modified
+  body_kb           response body bytes the stub sent
+
+Three cycles are measured: ``cold`` (every package due), ``tick`` (the next
+scheduler tick right after it) and ``warm`` (every package due again, with
+nothing changed on the carrier side, so conditional requests can get 304s).
+``--no-etag`` turns the stub's ETags off for a baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from _common import load
+from stub_server import StubCarrierServer
+
+HEARTBEAT = 0.005
+
+
+class LoopMonitor:
+    """Measures how late a periodic heartbeat wakes up, i.e. event-loop blocking."""
+
+    def __init__(self) -> None:
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _beat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(HEARTBEAT)
+            self.max_lag = max(self.max_lag, loop.time() - start - HEARTBEAT)
+
+    def __enter__(self) -> "LoopMonitor":
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._task.cancel()
+
+
+def _packages(const, count: int) -> dict:
+    pkgs = {}
+    for i in range(count):
+        carrier = const.CARRIER_DHL if i % 2 else const.CARRIER_INPOST
+        number = f"{'JJD' if carrier == const.CARRIER_DHL else '6'}{i:020d}"
+        pkgs[number] = {"carrier": carrier, "number": number, "name": ""}
+    return pkgs
+
+
+def _served(server: StubCarrierServer) -> tuple[int, int]:
+    """(requests, 304 responses) served so far."""
+    requests = sum(v for k, v in server.requests.items() if not k.endswith(("_errors", "_not_modified")))
+    return requests, sum(v for k, v in server.requests.items() if k.endswith("_not_modified"))
+
+
+async def _cycle(coordinator, server: StubCarrierServer) -> dict:
+    (before, before_304), before_bytes = _served(server), server.bytes_sent
+    with LoopMonitor() as monitor:
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        wall = time.perf_counter() - start
+    after, after_304 = _served(server)
+    return {
+        "wall_s": round(wall, 4),
+        "loop_block_max_ms": round(monitor.max_lag * 1000, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "requests": after - before,
+        "not_modified": after_304 - before_304,
+        "body_kb": round((server.bytes_sent - before_bytes) / 1024, 1),
+    }
+
+
+async def run(sizes: list[int], latency_ms: float, error_rate: float, etag: bool = True) -> list[dict]:
+    from homeassistant.core import HomeAssistant
+
+    api = load("api")
+    const = load("const")
+    browser = load("browser")
+    coordinator_mod = load("coordinator")
+    metrics_mod = load("metrics")
+
+    server = StubCarrierServer(latency_ms, error_rate, etag=etag)
+    await server.start()
+    server.point_integration_here(api)
+
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        try:
+            for size in sizes:
+                entry = SimpleNamespace(entry_id=f"bench_{size}", options={const.CONF_PACKAGES: _packages(const, size)})
+                metrics = metrics_mod.FetchMetrics()
+                pool = browser.DhlBrowserPool(hass, metrics)
+                coordinator = coordinator_mod.PackageDataCoordinator(hass, entry, pool, metrics)
+                for cycle in ("cold", "tick", "warm"):
+                    if cycle == "warm":
+                        # Everything due, and past the single-flight freshness window
+                        coordinator.scheduler._next_due.clear()  # noqa: SLF001
+                        coordinator._flights._recent.clear()  # noqa: SLF001
+                    row = {"packages": size, "cycle": cycle, "latency_ms": latency_ms, "error_rate": error_rate}
+                    row.update(await _cycle(coordinator, server))
+                    results.append(row)
+                await pool.async_close()
+                await coordinator.http.async_close()
+        finally:
+            await hass.async_stop(force=True)
+            await server.close()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-etag", action="store_true", help="stub sends no ETags (no 304s)")
+    parser.add_argument("--output", help="write the JSON results here as well")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.latency_ms, args.error_rate, not args.no_etag))
+    for row in results:
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
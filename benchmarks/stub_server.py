@@ -0,0 +1,166 @@
+"""Local stand-in for the carrier endpoints the integration talks to.
+
+    python benchmarks/stub_server.py [--port 8099] [--latency-ms 50] [--error-rate 0.05] [--no-etag]
+
+Serves:
+  GET /v1/tracking/<number>          InPost ShipX tracking JSON
+  GET /utapi?trackingNumber=<number> DHL tracking JSON (what the tracking page calls)
+  GET /dhl?tracking-id=<number>      A minimal DHL tracking page for the Chrome path
+
+Statuses are derived from the tracking number so runs are reproducible. JSON
+responses carry an ETag and answer a matching If-None-Match with 304, like
+the carrier CDNs do; ``bytes_sent`` counts response body bytes.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from collections import Counter
+from typing import Optional
+
+from aiohttp import web
+
+INPOST_STATUSES = (
+    "confirmed", "collected_from_sender", "adopted_at_sorting_center",
+    "sent_from_sorting_center", "out_for_delivery", "ready_to_pickup", "delivered",
+)
+DHL_STATUSES = (
+    ("pre-transit", "Przesyłka przyjęta w terminalu nadawczym DHL"),
+    ("transit", "Przesyłka jest obsługiwana w centrum sortowania"),
+    ("transit", "Przesyłka przekazana kurierowi do doręczenia"),
+    ("delivered", "Przesyłka doręczona do odbiorcy"),
+)
+
+DHL_PAGE = """<!DOCTYPE html><html><body>
+<form><input class="js--tracking--input" value="{number}"><button class="js--tracking--input-submit">Track</button></form>
+<div class="c-tracking-result--status-copy-message">{description}, Kod nadania przesyłki: {number}</div>
+<div class="c-tracking-result--status-copy-date">{timestamp}</div>
+</body></html>"""
+
+
+def _pick(number: str, choices: tuple):
+    return choices[zlib.crc32(number.encode()) % len(choices)]
+
+
+class StubCarrierServer:
+    """aiohttp app with configurable latency, error rate, DHL JSON availability and ETags."""
+
+    def __init__(
+        self, latency_ms: float = 0, error_rate: float = 0.0, dhl_json: bool = True, seed: int = 0, etag: bool = True
+    ) -> None:
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.dhl_json = dhl_json
+        self.etag = etag
+        self.requests: Counter[str] = Counter()
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+        self.app = web.Application()
+        self.app.router.add_get("/v1/tracking/{number}", self._inpost)
+        self.app.router.add_get("/utapi", self._dhl_json)
+        self.app.router.add_get("/dhl", self._dhl_page)
+
+    async def _delay_or_fail(self, kind: str) -> Optional[web.Response]:
+        self.requests[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.requests[f"{kind}_errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return None
+
+    def _json(self, request: web.Request, kind: str, payload: dict) -> web.Response:
+        body = json.dumps(payload).encode()
+        headers = {}
+        if self.etag:
+            etag = f'"{zlib.crc32(body):08x}"'
+            headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                self.requests[f"{kind}_not_modified"] += 1
+                return web.Response(status=304, headers=headers)
+        self.bytes_sent += len(body)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def _inpost(self, request: web.Request) -> web.Response:
+        if (err := await self._delay_or_fail("inpost")) is not None:
+            return err
+        number = request.match_info["number"]
+        status = _pick(number, INPOST_STATUSES)
+        return self._json(request, "inpost", {
+            "tracking_number": number,
+            "status": status,
+            "tracking_details": [
+                {"status": status, "datetime": "2024-05-06T10:12:00.000+02:00"},
+                {"status": "confirmed", "datetime": "2024-05-04T18:20:00.000+02:00"},
+            ],
+        })
+
+    async def _dhl_json(self, request: web.Request) -> web.Response:
+        if (err := await self._delay_or_fail("dhl_json")) is not None:
+            return err
+        if not self.dhl_json:
+            return web.Response(status=403, text="Forbidden")
+        number = request.query.get("trackingNumber", "")
+        code, description = _pick(number, DHL_STATUSES)
+        return self._json(request, "dhl_json", {"shipments": [{
+            "id": number,
+            "status": {"statusCode": code, "description": description, "timestamp": "2024-05-06T10:12:00"},
+            "events": [{"statusCode": code, "description": description, "timestamp": "2024-05-06T10:12:00"}],
+        }]})
+
+    async def _dhl_page(self, request: web.Request) -> web.Response:
+        if (err := await self._delay_or_fail("dhl_page")) is not None:
+            return err
+        number = request.query.get("tracking-id", "")
+        _, description = _pick(number, DHL_STATUSES)
+        body = DHL_PAGE.format(number=number, description=description, timestamp="2024-05-06 10:12")
+        self.bytes_sent += len(body.encode())
+        return web.Response(text=body, content_type="text/html")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def point_integration_here(self, api) -> None:
+        """Redirect the integration's carrier URLs (module globals of ``api``) to this server."""
+        api.INPOST_URL = f"{self.base_url}/v1/tracking/{{number}}"
+        api.DHL_API_URL = f"{self.base_url}/utapi?trackingNumber={{number}}"
+        api.DHL_URL = f"{self.base_url}/dhl?tracking-id={{number}}"
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = StubCarrierServer(args.latency_ms, args.error_rate, not args.no_dhl_json, etag=not args.no_etag)
+    url = await server.start(port=args.port)
+    print(f"Stub carrier server on {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-dhl-json", action="store_true", help="force DHL lookups onto the Chrome path")
+    parser.add_argument("--no-etag", action="store_true", help="always send full bodies, never 304")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
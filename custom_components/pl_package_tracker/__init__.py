@@ -2,24 +2,63 @@
 from __future__ import annotations
 
 from datetime import timedelta
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, Event
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.typing import ConfigType
-from homeassistant.const import Platform
-from .const import DOMAIN, PLATFORMS, UPDATE_INTERVAL_MIN
+from homeassistant.const import Platform, EVENT_HOMEASSISTANT_STOP
+from homeassistant.helpers.storage import Store
+from .const import DOMAIN, PLATFORMS, UPDATE_INTERVAL_MIN, CACHE_VERSION
+from .archive import PackageArchive
+from .browser import DhlBrowserPool
+from .coordinator import PackageDataCoordinator
+from .metrics import FetchMetrics
 from .services import async_setup_services
+from .webhook import async_register_webhook, async_unregister_webhook
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
+
+    metrics = FetchMetrics()
+    browser_pool = DhlBrowserPool(hass, metrics)
+    coordinator = PackageDataCoordinator(hass, entry, browser_pool, metrics)
+    # Entities are created from the cached results; fresh data follows in the background
+    await coordinator.async_load_cache()
+    hass.data[DOMAIN][entry.entry_id] = coordinator
+    # InPost status callbacks land here and update single packages right away
+    async_register_webhook(hass, entry)
+    entry.async_on_unload(lambda: async_unregister_webhook(hass, entry))
+
+    async def _async_stop(event: Event) -> None:
+        await browser_pool.async_close()
+        await coordinator.http.async_close()
+
+    entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop))
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+
     await hass.config_entries.async_forward_entry_setups(entry, [Platform.SENSOR])
     await async_setup_services(hass)
+    # A background task: startup doesn't wait for it, unload cancels it
+    entry.async_create_background_task(hass, coordinator.async_refresh(), f"{DOMAIN} first refresh")
     return True
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    # Add/remove only the affected entities instead of reloading the entry
+    coordinator: PackageDataCoordinator = hass.data[DOMAIN][entry.entry_id]
+    await coordinator.async_sync_packages()
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, [Platform.SENSOR])
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if coordinator is not None:
+            await coordinator.browser_pool.async_close()
+            await coordinator.http.async_close()
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await Store(hass, CACHE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
+    await Store(hass, CACHE_VERSION, f"{DOMAIN}.{entry.entry_id}.timeline").async_remove()
+    await PackageArchive(hass, entry.entry_id).async_remove()
@@ -1,211 +1,154 @@
 from __future__ import annotations
 import asyncio
-import json
-import re
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-
-from aiohttp.client import ClientSession
-from bs4 import BeautifulSoup
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import ClientError
+
+from .browser import DhlBrowserPool
+from .http_client import CarrierHttpClient
+from .classifier import short_from_detail, short_from_inpost
+from .const import SOURCE_HTTP, SOURCE_BROWSER, CARRIER_DHL, CARRIER_INPOST
+from .metrics import FetchMetrics, PHASE_HTTP, COUNT_FALLBACKS
 
 DHL_URL = "https://www.dhl.com/pl-pl/home/sledzenie-przesylek.html?tracking-id={number}"
+# JSON endpoint the DHL tracking page itself calls to render the result
+DHL_API_URL = "https://www.dhl.com/utapi?trackingNumber={number}&language=pl&requesterCountryCode=PL&source=tt"
 INPOST_URL = "https://api-shipx-pl.easypack24.net/v1/tracking/{number}"
 
+class CarrierError(Exception):
+    """The carrier could not answer (5xx, rate limited); keep the previous result."""
+
+# InPost statuses after which the parcel will not move again
+INPOST_FINAL_STATUSES = {"delivered", "canceled"}
+
+# Map InPost status names to their titles
+INPOST_STATUS_TITLES = {
+    "created": "Przesyłka utworzona",
+    "confirmed": "Przygotowana przez Nadawcę",
+    "dispatched_by_sender": "Paczka nadana w automacie Paczkomat",
+    "collected_from_sender": "Odebrana od klienta",
+    "taken_by_courier": "Odebrana od Nadawcy",
+    "adopted_at_source_branch": "Przyjęta w oddziale InPost",
+    "sent_from_source_branch": "W trasie",
+    "adopted_at_sorting_center": "Przyjęta w Sortowni",
+    "sent_from_sorting_center": "Wysłana z Sortowni",
+    "adopted_at_target_branch": "Przyjęta w Oddziale Docelowym",
+    "out_for_delivery": "Przekazano do doręczenia",
+    "ready_to_pickup": "Umieszczona w automacie Paczkomat",
+    "delivered": "Dostarczona",
+    "returned_to_sender": "Zwrot do nadawcy",
+    "avizo": "Powrót do oddziału",
+    "canceled": "Anulowano etykietę",
+    "undelivered": "Przekazanie do magazynu przesyłek niedoręczalnych",
+    "stack_in_box_machine": "Paczka magazynowana w tymczasowym automacie",
+    "stack_in_customer_service_point": "Paczka magazynowana w PaczkoPunkcie"
+}
+
 def _norm(s: Optional[str]) -> str:
     return (s or "").strip()
 
-def _short_from_detail(detail: str) -> str:
-    t = detail.lower()
-    # Delivered
-    if any(k in t for k in [
-        "delivered", 
-        "doręczono", 
-        "odebrano", 
-        "dostarczono",
-        "przesyłka doręczona do odbiorcy",
-        "the shipment has been successfully delivered"
-    ]):
-        return "Delivered"
-    
-    # Out for delivery (today)
-    if any(k in t for k in [
-        "out_for_delivery", 
-        "w doręczeniu", 
-        "kurier w drodze", 
-        "dzisiaj doręczenie", 
-        "przekazano do doręczenia", 
-        "in delivery",
-        "przesyłka przekazana kurierowi do doręczenia",
-        "the shipment has been loaded onto the delivery vehicle"
-    ]):
-        return "In delivery Today"
-    
-    # Label created / registered
-    if any(k in t for k in [
-        "created", 
-        "confirmed", 
-        "utworzono", 
-        "przygotowana przez nadawcę",
-        "zarejestrowano", 
-        "nadanie zarejestrowane",
-        "przesyłka przyjęta w terminalu nadawczym dhl"
-    ]):
-        return "Label created"
-    
-    # Transit / processing
-    if any(k in t for k in [
-        "przesyłka jest obsługiwana w centrum sortowania",
-        "the shipment has been processed in the parcel center"
-    ]):
-        return "In transit"
-    
-    # Default case for any other status
-    return "In transit"
-
-async def fetch_dhl(session: ClientSession, number: str) -> Dict[str, Any]:
-    # Setup Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    
-    # Initialize the driver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    
+def _dhl_events(shipment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    events = []
+    for event in shipment.get("events") or ():
+        if not isinstance(event, dict):
+            continue
+        text = _norm(event.get("description") or event.get("status"))
+        at = _norm(event.get("timestamp"))
+        if text and at:
+            events.append({"at": at, "status": _norm(event.get("statusCode")) or text, "detail": text})
+    return events
+
+def _parse_dhl_json(data: Any) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    shipments = data.get("shipments") if isinstance(data, dict) else None
+    if not shipments or not isinstance(shipments[0], dict):
+        return None
+    status = shipments[0].get("status") or {}
+    status_text = _norm(status.get("description") or status.get("status"))
+    if not status_text:
+        return None
+
+    date_text = _norm(status.get("timestamp"))
+    detail = f"{status_text} ({date_text})" if date_text else status_text
+    return detail, _dhl_events(shipments[0])
+
+async def _fetch_dhl_http(
+    client: CarrierHttpClient, number: str, metrics: FetchMetrics
+) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """Read the status and events from DHL's tracking JSON; ``None`` if it gave us nothing usable.
+
+    Raises CarrierError when the endpoint is rate limiting us or failing.
+    """
+    url = DHL_API_URL.format(number=number)
+    headers = {
+        "User-Agent": "Mozilla/5.0",
+        "Accept": "application/json",
+        "Referer": DHL_URL.format(number=number),
+    }
     try:
-        # Navigate to the tracking page
-        url = DHL_URL.format(number=number)
-        driver.get(url)
-        
-        # Wait for and click the submit button
-        submit_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, ".js--tracking--input-submit"))
-        )
-        submit_button.click()
-        
-        # Wait for status message element
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, '.c-tracking-result--status-copy-message'))
-        )
-        
-        # Get the page source after JavaScript execution
-        text = driver.page_source
-        soup = BeautifulSoup(text, "html.parser")
-        
-        # Try to get status message and date
-        status_text = ""
-        date_text = ""
-        
-        # First try the main status message
-        status_element = soup.select_one('.c-tracking-result--status-copy-message')
-        if status_element:
-            status_text = _norm(status_element.get_text(" ", strip=True))
-            # Remove tracking number if present
-            status_text = re.sub(r',\s*Kod nadania przesyłki:.*$', '', status_text)
-            
-            # Try to get the date
-            date_element = soup.select_one('.c-tracking-result--status-copy-date')
-            if date_element:
-                date_text = _norm(date_element.get_text(" ", strip=True))
-                
-        # Fallback to other status elements if main one not found
-        if not status_text:
-            status_elements = soup.select('.tracking-status, .status-text, .shipment-status')
-            for element in status_elements:
-                status_text = _norm(element.get_text(" ", strip=True))
-                if status_text:
-                    break
-                    
-        if not status_text:
-            patterns = [
-                # Delivery patterns
-                r"(Doręczono|W doręczeniu|W tranzycie|Nadanie|Przesyłka w drodze)",
-                r"(przesyłka doręczona do odbiorcy|the shipment has been successfully delivered)",
-                
-                # In transit patterns
-                r"(przesyłka jest obsługiwana w centrum sortowania|the shipment has been processed in the parcel center)",
-                r"(przesyłka przekazana kurierowi do doręczenia|the shipment has been loaded onto the delivery vehicle)",
-                
-                # Initial status patterns
-                r"(przesyłka przyjęta w terminalu nadawczym dhl)",
-                
-                # Generic patterns
-                r"(Delivered|Out for delivery|In transit|Shipment picked up)",
-                r"Status:?\s*([^<>\n]+)"
-            ]
-            
-            for pattern in patterns:
-                m = re.search(pattern, text, re.I)
-                if m:
-                    status_text = m.group(1)
-                    break
-
-        if not status_text:
-            status_text = "Unknown / parsing failed"
-
-        # Combine status and date if available
-        detail = status_text
-        if date_text:
-            detail = f"{status_text} ({date_text})"
-
-    finally:
-        # Always close the browser
-        driver.quit()
-
-    short = _short_from_detail(detail)
+        with metrics.timed(CARRIER_DHL, PHASE_HTTP):
+            status, parsed = await client.get_json(CARRIER_DHL, url, _parse_dhl_json, headers)
+    except (ClientError, asyncio.TimeoutError, ValueError):
+        return None
+    # Rate limited or down: a failure for the breaker, not a reason to start Chrome
+    if status == 429 or status >= 500:
+        raise CarrierError(f"HTTP {status}")
+    if status == 304:
+        # Unchanged: its events are already in the timeline
+        return parsed[0], []
+    return parsed
+
+async def fetch_dhl(
+    client: CarrierHttpClient, number: str, pool: DhlBrowserPool, metrics: FetchMetrics
+) -> Dict[str, Any]:
+    # Plain HTTP first; Chrome only when the JSON endpoint fails us
+    source = SOURCE_HTTP
+    events: List[Dict[str, Any]] = []
+    fetched = await _fetch_dhl_http(client, number, metrics)
+    if fetched is not None:
+        detail, events = fetched
+    else:
+        source = SOURCE_BROWSER
+        metrics.increment(CARRIER_DHL, COUNT_FALLBACKS)
+        detail = await pool.async_scrape(DHL_URL.format(number=number))
+
+    short = short_from_detail(detail)
     return {
         "carrier": "dhl",
         "number": number,
         "detail": detail,
         "short": short,
+        "source": source,
+        "events": events,
         "last_update": datetime.now(timezone.utc).isoformat()
     }
 
-async def fetch_inpost(session: ClientSession, number: str) -> Dict[str, Any]:
+async def fetch_inpost(
+    client: CarrierHttpClient, number: str, pool: DhlBrowserPool, metrics: FetchMetrics
+) -> Dict[str, Any]:
     url = INPOST_URL.format(number=number)
     headers = {"User-Agent": "Mozilla/5.0"}
-    async with session.get(url, headers=headers) as resp:
-        if resp.status != 200:
-            detail = f"HTTP {resp.status}"
-            return {
-                "carrier": "inpost",
-                "number": number,
-                "detail": detail,
-                "short": _short_from_detail(detail),
-                "last_update": datetime.now(timezone.utc).isoformat()
-            }
-        data = await resp.json(content_type=None)
-
-    # Map status names to their titles
-    status_map = {
-        "created": "Przesyłka utworzona",
-        "confirmed": "Przygotowana przez Nadawcę",
-        "dispatched_by_sender": "Paczka nadana w automacie Paczkomat",
-        "collected_from_sender": "Odebrana od klienta",
-        "taken_by_courier": "Odebrana od Nadawcy",
-        "adopted_at_source_branch": "Przyjęta w oddziale InPost",
-        "sent_from_source_branch": "W trasie",
-        "adopted_at_sorting_center": "Przyjęta w Sortowni",
-        "sent_from_sorting_center": "Wysłana z Sortowni",
-        "adopted_at_target_branch": "Przyjęta w Oddziale Docelowym",
-        "out_for_delivery": "Przekazano do doręczenia",
-        "ready_to_pickup": "Umieszczona w automacie Paczkomat",
-        "delivered": "Dostarczona",
-        "returned_to_sender": "Zwrot do nadawcy",
-        "avizo": "Powrót do oddziału",
-        "canceled": "Anulowano etykietę",
-        "undelivered": "Przekazanie do magazynu przesyłek niedoręczalnych",
-        "stack_in_box_machine": "Paczka magazynowana w tymczasowym automacie",
-        "stack_in_customer_service_point": "Paczka magazynowana w PaczkoPunkcie"
-    }
+    with metrics.timed(CARRIER_INPOST, PHASE_HTTP):
+        status, result = await client.get_json(CARRIER_INPOST, url, lambda data: parse_inpost(number, data), headers)
+    if status == 429 or status >= 500:
+        raise CarrierError(f"HTTP {status}")
+    if status == 304:
+        # Unchanged: its events are already in the timeline
+        return {**result, "events": [], "last_update": datetime.now(timezone.utc).isoformat()}
+    if status != 200:
+        detail = f"HTTP {status}"
+        return {
+            "carrier": "inpost",
+            "number": number,
+            "detail": detail,
+            "short": short_from_detail(detail),
+            "source": SOURCE_HTTP,
+            "last_update": datetime.now(timezone.utc).isoformat()
+        }
+    return result
 
+def parse_inpost(number: str, data: Dict[str, Any], source: str = SOURCE_HTTP) -> Dict[str, Any]:
+    """Build a result from ShipX tracking JSON (polled or pushed)."""
     # Get status from tracking data
     status = None
     for path in [["status"], ["tracking", "status"], ["status", "name"]]:
@@ -216,22 +159,39 @@ async def fetch_inpost(session: ClientSession, number: str) -> Dict[str, Any]:
             else:
                 curr = None
                 break
-        if curr:
+        # "status" may be an object; then its "name" path is the code
+        if isinstance(curr, str) and curr:
             status = curr
             break
 
     # Get detail text
-    if status and status in status_map:
-        detail = status_map[status]
+    if status and status in INPOST_STATUS_TITLES:
+        detail = INPOST_STATUS_TITLES[status]
     else:
-        detail = data.get("status", {}).get("title", "Unknown status")
+        raw = data.get("status")
+        detail = (raw.get("title") if isinstance(raw, dict) else None) or status or "Unknown status"
 
-    short = _short_from_detail(detail)
+    events = []
+    for event in data.get("tracking_details") or ():
+        if isinstance(event, dict) and isinstance(event.get("status"), str) and event.get("datetime"):
+            code = event["status"]
+            events.append({"at": event["datetime"], "status": code, "detail": INPOST_STATUS_TITLES.get(code, code)})
+
+    short = short_from_inpost(status, detail)
     return {
         "carrier": "inpost",
         "number": number,
         "detail": detail,
         "short": short,
+        "source": source,
+        "status_code": status,
+        "final": status in INPOST_FINAL_STATUSES,
+        "events": events,
         "last_update": datetime.now(timezone.utc).isoformat()
     }
-s
\ No newline at end of file
+
+# Carrier backends, all called as fetch(client, number, pool, metrics)
+CARRIER_FETCHERS: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+    CARRIER_DHL: fetch_dhl,
+    CARRIER_INPOST: fetch_inpost,
+}
@@ -0,0 +1,60 @@
+
+from __future__ import annotations
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN
+
+# Fields kept per archived package
+ARCHIVE_FIELDS = ("number", "carrier", "name", "short", "detail", "delivered_at", "archived_at")
+
+class PackageArchive:
+    """Append-only JSON-lines history of packages removed from the active set.
+
+    Nothing is kept in memory: archiving appends lines, queries read the file
+    in the executor.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._hass = hass
+        self.path = hass.config.path(".storage", f"{DOMAIN}.{entry_id}.archive.jsonl")
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps({k: record.get(k) for k in ARCHIVE_FIELDS}, ensure_ascii=False) + "\n")
+
+    def _read(self, number: Optional[str], carrier: Optional[str], limit: Optional[int]) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        out = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a torn last line after a crash
+                if number and record.get("number") != number:
+                    continue
+                if carrier and record.get("carrier") != carrier:
+                    continue
+                out.append(record)
+        # Newest first
+        out.reverse()
+        return out[:limit] if limit else out
+
+    async def async_append(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            await self._hass.async_add_executor_job(self._append, records)
+
+    async def async_query(
+        self, number: Optional[str] = None, carrier: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        return await self._hass.async_add_executor_job(self._read, number, carrier, limit)
+
+    async def async_remove(self) -> None:
+        if os.path.exists(self.path):
+            await self._hass.async_add_executor_job(os.remove, self.path)
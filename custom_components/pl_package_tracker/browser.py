@@ -0,0 +1,223 @@
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from asyncio.subprocess import Process
+from itertools import count
+from typing import List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DHL_POOL_SIZE, DHL_POOL_MAX_PAGES, DHL_WORKER_MAX_RSS_MB, DHL_WORKER_PAGE_TIMEOUT_SEC,
+    DHL_WORKER_START_TIMEOUT_SEC, DHL_WORKER_BATCH, CARRIER_DHL, RATE_LIMIT_DHL_PAGE,
+)
+from .metrics import FetchMetrics, COUNT_WORKER_KILLS
+from .throttle import TokenBucket
+
+_LOGGER = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "dhl_scraper.py")
+
+class BrowserError(Exception):
+    """The browser worker failed to load or parse a page."""
+
+class _Worker:
+    def __init__(self, proc: Process) -> None:
+        self.proc = proc
+        self.pages = 0
+
+class DhlBrowserPool:
+    """Headless Chrome for DHL lookups, in separate worker processes.
+
+    Each of the ``size`` workers (dhl_scraper.py) runs its own Chrome and is
+    fed batches of pages over stdin/stdout. A worker whose page takes longer
+    than ``page_timeout`` or whose process tree grows past ``max_rss_mb`` is
+    killed together with its Chrome; one that has served ``max_pages`` is shut
+    down. Either way the next batch starts a fresh one, so a misbehaving page
+    never costs Home Assistant memory or an executor thread.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        metrics: Optional[FetchMetrics] = None,
+        size: int = DHL_POOL_SIZE,
+        max_pages: int = DHL_POOL_MAX_PAGES,
+        max_rss_mb: float = DHL_WORKER_MAX_RSS_MB,
+        page_timeout: float = DHL_WORKER_PAGE_TIMEOUT_SEC,
+    ) -> None:
+        self._hass = hass
+        self.metrics = metrics or FetchMetrics()
+        self._size = size
+        self._max_pages = max_pages
+        self._max_rss_mb = max_rss_mb
+        self._page_timeout = page_timeout
+        self._closed = False
+        self._page_bucket = TokenBucket(*RATE_LIMIT_DHL_PAGE)
+        self._ids = count()
+        self._queue: asyncio.Queue[Tuple[str, asyncio.Future]] = asyncio.Queue()
+        # Started on the first page, so setups that never need Chrome never spawn a worker
+        self._runners: List[asyncio.Task] = []
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    async def async_scrape(self, url: str) -> str:
+        """Load a DHL tracking page in a worker and return the status text."""
+        if self._closed:
+            raise BrowserError("browser pool closed")
+        await self._page_bucket.acquire()
+        # Runners only end when cancelled, but a pool without any would hang every page
+        self._runners = [task for task in self._runners if not task.done()]
+        for i in range(len(self._runners), self._size):
+            self._runners.append(
+                self._hass.async_create_background_task(self._async_runner(), f"dhl browser worker {i}")
+            )
+        future = self._hass.loop.create_future()
+        self._queue.put_nowait((url, future))
+        return await future
+
+    async def _async_runner(self) -> None:
+        worker: Optional[_Worker] = None
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                # Don't hand a worker more pages than it has left before recycling
+                limit = min(DHL_WORKER_BATCH, self._max_pages - (worker.pages if worker else 0))
+                while len(batch) < limit and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                # Callers that timed out meanwhile don't need their page any more
+                batch = [item for item in batch if not item[1].done()]
+                if not batch:
+                    continue
+                fresh = worker is None
+                try:
+                    if worker is None:
+                        worker = await self._async_spawn()
+                    worker = await self._async_run_batch(worker, batch, fresh)
+                except Exception as err:  # noqa: BLE001
+                    # Whatever went wrong, this runner must stay up for the next batch
+                    _LOGGER.warning("DHL browser worker failed: %r", err)
+                    if worker is not None:
+                        self.metrics.increment(CARRIER_DHL, COUNT_WORKER_KILLS)
+                        self._kill(worker)
+                        worker = None
+                    self._fail(batch, BrowserError(f"browser worker failed: {err!r}"))
+        finally:
+            # Cancelled (pool closed) in the middle of a batch: its callers mustn't wait on
+            self._fail(batch, BrowserError("browser pool closed"))
+            if worker is not None:
+                await self._async_stop(worker)
+
+    async def _async_spawn(self) -> _Worker:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT, str(self._page_timeout),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            # Own process group, so Chrome can be killed along with the worker
+            start_new_session=True,
+        )
+        return _Worker(proc)
+
+    async def _async_run_batch(
+        self, worker: _Worker, batch: List[Tuple[str, asyncio.Future]], fresh: bool
+    ) -> Optional[_Worker]:
+        """Send ``batch`` to the worker and settle its futures; returns the worker to reuse."""
+        pages = {next(self._ids): item for item in batch}
+        message = {"batch": [{"id": page_id, "url": url} for page_id, (url, _) in pages.items()]}
+        worker.proc.stdin.write((json.dumps(message) + "\n").encode())
+
+        for page_id, (url, future) in pages.items():
+            timeout = self._page_timeout + (DHL_WORKER_START_TIMEOUT_SEC if fresh else 0)
+            fresh = False
+            try:
+                await worker.proc.stdin.drain()
+                line = await asyncio.wait_for(worker.proc.stdout.readline(), timeout)
+                if not line:
+                    raise BrowserError("browser worker exited")
+                reply = json.loads(line)
+                if not isinstance(reply, dict):
+                    raise BrowserError(f"unexpected reply {line[:80]!r}")
+            except (asyncio.TimeoutError, BrowserError, ConnectionError, ValueError) as err:
+                reason = "page timed out" if isinstance(err, asyncio.TimeoutError) else err
+                _LOGGER.warning("DHL browser worker killed: %s", reason)
+                self.metrics.increment(CARRIER_DHL, COUNT_WORKER_KILLS)
+                self._kill(worker)
+                if not future.done():
+                    future.set_exception(err)
+                self._requeue(pages, after=page_id)
+                return None
+
+            worker.pages += 1
+            for phase, ms in (reply.get("timings") or {}).items():
+                self.metrics.observe(CARRIER_DHL, phase, ms)
+            if not future.done():
+                if reply.get("error"):
+                    future.set_exception(BrowserError(reply["error"]))
+                else:
+                    future.set_result(reply.get("detail") or "")
+
+            rss = reply.get("rss_mb")
+            if rss is not None and rss > self._max_rss_mb:
+                _LOGGER.info("DHL browser worker killed at %.0f MB", rss)
+                self.metrics.increment(CARRIER_DHL, COUNT_WORKER_KILLS)
+                self._kill(worker)
+                self._requeue(pages, after=page_id)
+                return None
+
+        if self._closed or worker.pages >= self._max_pages:
+            await self._async_stop(worker)
+            return None
+        return worker
+
+    @staticmethod
+    def _fail(batch: List[Tuple[str, asyncio.Future]], err: Exception) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(err)
+
+    def _requeue(self, pages: dict, after: int) -> None:
+        for page_id, item in pages.items():
+            if page_id > after and not item[1].done():
+                self._queue.put_nowait(item)
+
+    @staticmethod
+    def _kill(worker: _Worker) -> None:
+        try:
+            os.killpg(worker.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    async def _async_stop(self, worker: _Worker) -> None:
+        """Let the worker quit Chrome and exit; kill it if it doesn't."""
+        try:
+            worker.proc.stdin.close()
+            await asyncio.wait_for(worker.proc.wait(), 10)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._kill(worker)
+
+    async def async_close(self) -> None:
+        """Stop all workers and fail the pages they were loading or still waiting for one."""
+        self._closed = True
+        for task in self._runners:
+            task.cancel()
+        for task in self._runners:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._runners = []
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(BrowserError("browser pool closed"))
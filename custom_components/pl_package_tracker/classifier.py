@@ -0,0 +1,81 @@
+
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Optional
+
+from .const import SHORT_LABEL_CREATED, SHORT_IN_TRANSIT, SHORT_OUT_FOR_DELIVERY, SHORT_DELIVERED
+
+# InPost ShipX status code -> short state, no text round-trip needed
+INPOST_STATUS_SHORT = {
+    "created": SHORT_LABEL_CREATED,
+    "confirmed": SHORT_LABEL_CREATED,
+    "dispatched_by_sender": SHORT_IN_TRANSIT,
+    "collected_from_sender": SHORT_IN_TRANSIT,
+    "taken_by_courier": SHORT_IN_TRANSIT,
+    "adopted_at_source_branch": SHORT_IN_TRANSIT,
+    "sent_from_source_branch": SHORT_IN_TRANSIT,
+    "adopted_at_sorting_center": SHORT_IN_TRANSIT,
+    "sent_from_sorting_center": SHORT_IN_TRANSIT,
+    "adopted_at_target_branch": SHORT_IN_TRANSIT,
+    "out_for_delivery": SHORT_OUT_FOR_DELIVERY,
+    "ready_to_pickup": SHORT_IN_TRANSIT,
+    "delivered": SHORT_DELIVERED,
+    "returned_to_sender": SHORT_IN_TRANSIT,
+    "avizo": SHORT_IN_TRANSIT,
+    "canceled": SHORT_IN_TRANSIT,
+    "undelivered": SHORT_IN_TRANSIT,
+    "stack_in_box_machine": SHORT_IN_TRANSIT,
+    "stack_in_customer_service_point": SHORT_IN_TRANSIT,
+}
+
+# Free-text keywords, highest priority first
+_KEYWORDS = (
+    (SHORT_DELIVERED, (
+        "delivered",
+        "doręczono",
+        "odebrano",
+        "dostarczono",
+        "przesyłka doręczona do odbiorcy",
+        "the shipment has been successfully delivered",
+    )),
+    (SHORT_OUT_FOR_DELIVERY, (
+        "out_for_delivery",
+        "w doręczeniu",
+        "kurier w drodze",
+        "dzisiaj doręczenie",
+        "przekazano do doręczenia",
+        "in delivery",
+        "przesyłka przekazana kurierowi do doręczenia",
+        "the shipment has been loaded onto the delivery vehicle",
+    )),
+    (SHORT_LABEL_CREATED, (
+        "created",
+        "confirmed",
+        "utworzono",
+        "przygotowana przez nadawcę",
+        "zarejestrowano",
+        "nadanie zarejestrowane",
+        "przesyłka przyjęta w terminalu nadawczym dhl",
+    )),
+)
+
+# Built once: one compiled alternation per state, matched against lowercased text
+_MATCHERS = tuple(
+    (short, re.compile("|".join(re.escape(k) for k in keywords)))
+    for short, keywords in _KEYWORDS
+)
+
+@lru_cache(maxsize=1024)
+def short_from_detail(detail: str) -> str:
+    t = detail.lower()
+    for short, matcher in _MATCHERS:
+        if matcher.search(t):
+            return short
+    # Anything else (sorting centre, in transit, ...) counts as in transit
+    return SHORT_IN_TRANSIT
+
+def short_from_inpost(status: Optional[str], detail: str) -> str:
+    if isinstance(status, str) and status in INPOST_STATUS_SHORT:
+        return INPOST_STATUS_SHORT[status]
+    return short_from_detail(detail)
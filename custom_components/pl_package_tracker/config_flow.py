@@ -6,12 +6,16 @@ from homeassistant.helpers import config_validation as cv
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 from .const import (
     DOMAIN, CONF_PACKAGES, CONF_CARRIER, CONF_NUMBER, CONF_NAME,
-    CARRIER_DHL, CARRIER_INPOST
+    CARRIER_DHL, CARRIER_INPOST, CONF_ARCHIVE_AFTER_DAYS, DEFAULT_ARCHIVE_AFTER_DAYS,
 )
+from .tracking_numbers import merge_packages
+from .webhook import webhook_url
 
 CARRIERS = { "DHL": CARRIER_DHL, "InPost": CARRIER_INPOST }
+CARRIER_AUTO = "auto"
 
 def _pkg_schema(defaults: dict | None = None) -> vol.Schema:
     defaults = defaults or {}
@@ -52,7 +56,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         self._packages = dict(config_entry.options.get(CONF_PACKAGES, {}))
 
     async def async_step_init(self, user_input=None) -> FlowResult:
-        return self.async_show_menu(step_id="init", menu_options=["add", "remove"])
+        return self.async_show_menu(step_id="init", menu_options=["add", "add_bulk", "remove", "settings"])
 
     async def async_step_add(self, user_input=None) -> FlowResult:
         if user_input is not None:
@@ -66,6 +70,21 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         return self.async_show_form(step_id="add", data_schema=_pkg_schema())
 
+    async def async_step_add_bulk(self, user_input=None) -> FlowResult:
+        errors = {}
+        if user_input is not None:
+            carrier = user_input["carrier"]
+            added, _, _ = merge_packages(self._packages, user_input["numbers"], None if carrier == CARRIER_AUTO else carrier)
+            if added:
+                return await self._save_and_exit()
+            errors["base"] = "no_new_numbers"
+
+        schema = vol.Schema({
+            vol.Required("numbers"): TextSelector(TextSelectorConfig(multiline=True)),
+            vol.Required("carrier", default=CARRIER_AUTO): vol.In([CARRIER_AUTO, *CARRIERS.values()]),
+        })
+        return self.async_show_form(step_id="add_bulk", data_schema=schema, errors=errors)
+
     async def async_step_remove(self, user_input=None) -> FlowResult:
         numbers = list(self._packages.keys())
         if not numbers:
@@ -79,7 +98,20 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         return self.async_show_form(step_id="remove", data_schema=schema)
 
-    async def _save_and_exit(self) -> FlowResult:
-        options = dict(self._entry.options)
+    async def async_step_settings(self, user_input=None) -> FlowResult:
+        if user_input is not None:
+            return await self._save_and_exit(user_input)
+
+        days = self._entry.options.get(CONF_ARCHIVE_AFTER_DAYS, DEFAULT_ARCHIVE_AFTER_DAYS)
+        schema = vol.Schema({
+            vol.Required(CONF_ARCHIVE_AFTER_DAYS, default=days): vol.All(vol.Coerce(int), vol.Range(min=0, max=365)),
+        })
+        return self.async_show_form(
+            step_id="settings", data_schema=schema,
+            description_placeholders={"webhook_url": webhook_url(self.hass, self._entry) or "-"},
+        )
+
+    async def _save_and_exit(self, settings: dict | None = None) -> FlowResult:
+        options = {**self._entry.options, **(settings or {})}
         options[CONF_PACKAGES] = self._packages
         return self.async_create_entry(title="", data=options)
@@ -5,10 +5,98 @@ CONF_PACKAGES = "packages"  # stored in options
 CONF_CARRIER = "carrier"
 CONF_NUMBER = "number"
 CONF_NAME = "name"
+CONF_WEBHOOK_ID = "webhook_id"  # stored in data
 CARRIER_DHL = "dhl"
 CARRIER_INPOST = "inpost"
 UPDATE_INTERVAL_MIN = 7
 
+# Days a package stays "Delivered" before it is moved to the archive; 0 keeps it forever
+CONF_ARCHIVE_AFTER_DAYS = "archive_after_days"
+DEFAULT_ARCHIVE_AFTER_DAYS = 7
+
+# Carrier events kept per package, and the bus event fired for each new one
+TIMELINE_MAX_EVENTS = 50
+EVENT_TRACKING_EVENT = DOMAIN + "_tracking_event"
+
+# Dispatcher signal (formatted with the entry id) for incremental entity changes
+SIGNAL_PACKAGES_UPDATED = DOMAIN + "_packages_updated_{}"
+SCHEDULER_TICK_MIN = 1
+
+# Per-package polling intervals picked by the scheduler from the short status
+POLL_OUT_FOR_DELIVERY_MIN = 3
+POLL_IN_TRANSIT_MIN = UPDATE_INTERVAL_MIN
+POLL_LABEL_CREATED_MIN = 60
+POLL_STALE_MIN = 30       # in transit, unchanged for STALE_AFTER_HOURS
+POLL_DORMANT_MIN = 120    # in transit, unchanged for DORMANT_AFTER_HOURS
+POLL_NIGHT_MIN = 60
+STALE_AFTER_HOURS = 24
+DORMANT_AFTER_HOURS = 72
+NIGHT_START_HOUR = 22
+NIGHT_END_HOUR = 6
+
+# Last known results, kept in .storage for instant startup
+CACHE_VERSION = 1
+CACHE_SAVE_DELAY_SEC = 10
+
+# Headless Chrome worker processes used for DHL scraping
+DHL_POOL_SIZE = 2
+DHL_POOL_MAX_PAGES = 50         # a worker is replaced after this many pages
+DHL_WORKER_MAX_RSS_MB = 700     # ... or once it (with its Chrome) grows past this
+DHL_WORKER_PAGE_TIMEOUT_SEC = 45
+DHL_WORKER_START_TIMEOUT_SEC = 120  # extra time for the first page: Chrome start, driver download
+DHL_WORKER_BATCH = 10
+
+# Dedicated HTTP client for the carrier APIs
+HTTP_POOL_LIMIT = 20
+HTTP_POOL_LIMIT_PER_HOST = 8
+HTTP_CONNECT_TIMEOUT_SEC = 10
+HTTP_READ_TIMEOUT_SEC = 20
+HTTP_DNS_CACHE_SEC = 300
+HTTP_KEEPALIVE_SEC = 60
+HTTP_VALIDATOR_CACHE_SIZE = 2000   # URLs whose ETag / Last-Modified (and parsed value) are kept
+
+# A fetch finished this recently is reused instead of hitting the carrier again
+SINGLE_FLIGHT_FRESH_SEC = 30
+
+# Circuit breaker per carrier: open after N consecutive failures, cooldown doubles per trip
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SEC = 60
+BREAKER_MAX_COOLDOWN_SEC = 1800
+
+# Token buckets per carrier endpoint: (requests per second, burst)
+RATE_LIMIT_DHL_API = (10, 20)
+RATE_LIMIT_DHL_PAGE = (0.5, 2)
+RATE_LIMIT_INPOST = (20, 40)
+
+# Refresh fan-out: parallel fetches and per-request timeout for each carrier.
+# DHL's Chrome fallback is additionally bounded by the browser pool size.
+CARRIER_CONCURRENCY = {CARRIER_DHL: 4, CARRIER_INPOST: 8}
+_HTTP_TIMEOUT_SEC = HTTP_CONNECT_TIMEOUT_SEC + HTTP_READ_TIMEOUT_SEC
+# A DHL fetch may need the JSON attempt, a page token, a wait behind the other
+# pages queued for the same worker, a worker (re)start and its own page; the
+# pool kills a hung page itself, so this only has to stay out of its way
+_DHL_PAGES_PER_WORKER = -(-CARRIER_CONCURRENCY[CARRIER_DHL] // DHL_POOL_SIZE)
+CARRIER_TIMEOUT_SEC = {
+    CARRIER_DHL: (
+        _HTTP_TIMEOUT_SEC
+        + CARRIER_CONCURRENCY[CARRIER_DHL] / RATE_LIMIT_DHL_PAGE[0]
+        + DHL_WORKER_START_TIMEOUT_SEC
+        + _DHL_PAGES_PER_WORKER * DHL_WORKER_PAGE_TIMEOUT_SEC
+    ),
+    CARRIER_INPOST: _HTTP_TIMEOUT_SEC,
+}
+
+# A package that keeps failing backs off exponentially up to this long
+FAILURE_BACKOFF_MAX_MIN = 360
+
+# Which path produced a result (stored under "source")
+SOURCE_HTTP = "http"
+SOURCE_BROWSER = "browser"
+SOURCE_PUSH = "push"
+
+# Packages the carrier pushes updates for are only polled this often, as a safety net
+POLL_PUSH_SAFETY_MIN = 360
+
 SHORT_LABEL_CREATED = "Label created"
 SHORT_IN_TRANSIT = "In transit"
 SHORT_OUT_FOR_DELIVERY = "In delivery Today"
@@ -1,48 +1,365 @@
 
 from __future__ import annotations
+import asyncio
 import logging
-from datetime import timedelta
-from typing import Any, Dict, List
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from .const import UPDATE_INTERVAL_MIN, CONF_PACKAGES, CARRIER_DHL, CARRIER_INPOST
-from .api import fetch_dhl, fetch_inpost
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from .const import (
+    DOMAIN, CACHE_VERSION, CACHE_SAVE_DELAY_SEC, SIGNAL_PACKAGES_UPDATED,
+    SCHEDULER_TICK_MIN, CONF_PACKAGES, CONF_ARCHIVE_AFTER_DAYS, DEFAULT_ARCHIVE_AFTER_DAYS,
+    CARRIER_CONCURRENCY, CARRIER_TIMEOUT_SEC, SHORT_IN_TRANSIT,
+    CARRIER_DHL, CARRIER_INPOST, RATE_LIMIT_DHL_API, RATE_LIMIT_INPOST, SINGLE_FLIGHT_FRESH_SEC,
+    EVENT_TRACKING_EVENT,
+)
+from .api import CARRIER_FETCHERS
+from .archive import PackageArchive
+from .browser import DhlBrowserPool
+from .http_client import CarrierHttpClient
+from .scheduler import PollScheduler
+from .index import StatusIndex
+from .metrics import (
+    FetchMetrics, CARRIER_ALL, PHASE_FETCH, PHASE_CYCLE, COUNT_ERRORS, COUNT_TIMEOUTS, COUNT_SKIPPED,
+)
+from .throttle import CircuitBreaker, CircuitOpenError, TokenBucket
+from .singleflight import SingleFlight
+from .timeline import TimelineStore
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fields an entity actually shows; last_update is deliberately left out
+_FINGERPRINT_FIELDS = ("carrier", "detail", "short", "source", "status_code", "restored")
+
+def _fingerprint(result: Dict[str, Any]) -> int:
+    return hash(tuple(result.get(k) for k in _FINGERPRINT_FIELDS))
 
 class PackageDataCoordinator(DataUpdateCoordinator[Dict[str, Any]]):
-    def __init__(self, hass: HomeAssistant, entry):
+    def __init__(self, hass: HomeAssistant, entry, browser_pool: DhlBrowserPool, metrics: FetchMetrics):
         super().__init__(
             hass,
-            logging.getLogger(__name__),
+            _LOGGER,
             name="PL Package Tracker",
-            update_interval=timedelta(minutes=UPDATE_INTERVAL_MIN),
+            # Each tick only fetches packages the scheduler says are due
+            update_interval=timedelta(minutes=SCHEDULER_TICK_MIN),
         )
         self.entry = entry
+        self.browser_pool = browser_pool
+        self.metrics = metrics
+        self.http = CarrierHttpClient(hass, metrics)
+        self.scheduler = PollScheduler()
+        self._fingerprints: Dict[str, int] = {}
+        # Bumped whenever a package's result is replaced, so a fetch that started before loses to it
+        self._generations: Counter[str] = Counter()
+        # Numbers whose visible data changed (or disappeared) in the last update
+        self.changed_numbers: Set[str] = set()
+        self.index = StatusIndex()
+        self._store: Store = Store(hass, CACHE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        self._limits = {
+            carrier: asyncio.Semaphore(limit) for carrier, limit in CARRIER_CONCURRENCY.items()
+        }
+        # Rate limits for each carrier's main endpoint; Chrome page loads are limited by the pool
+        self._buckets = {
+            CARRIER_DHL: TokenBucket(*RATE_LIMIT_DHL_API),
+            CARRIER_INPOST: TokenBucket(*RATE_LIMIT_INPOST),
+        }
+        self.breakers = {carrier: CircuitBreaker() for carrier in CARRIER_FETCHERS}
+        self._flights = SingleFlight(SINGLE_FLIGHT_FRESH_SEC)
+        self.archive = PackageArchive(hass, entry.entry_id)
+        # Event history lives in its own store: it changes less often than the results
+        self.timelines = TimelineStore()
+        self._timeline_store: Store = Store(hass, CACHE_VERSION, f"{DOMAIN}.{entry.entry_id}.timeline")
+        # Package definitions the entities were last built from
+        self._known: Dict[str, dict] = dict(entry.options.get(CONF_PACKAGES, {}))
 
     @property
     def packages(self) -> List[dict]:
         return list(self.entry.options.get(CONF_PACKAGES, {}).values())
 
-    async def _async_update_data(self) -> Dict[str, Any]:
-        session = async_get_clientsession(self.hass)
-        tasks = []
-        for pkg in self.packages:
-            carrier = pkg["carrier"]
-            number = pkg["number"]
-            if carrier == CARRIER_DHL:
-                tasks.append(fetch_dhl(session, number))
-            elif carrier == CARRIER_INPOST:
-                tasks.append(fetch_inpost(session, number))
+    async def async_load_cache(self) -> None:
+        """Populate data from the last saved results without fetching anything."""
+        cached = await self._store.async_load() or {}
+        changed_at = cached.get("changed_at", {})
+        pushed = set(cached.get("pushed", ()))
+        numbers = {p["number"] for p in self.packages}
+        data: Dict[str, Any] = {}
+        for num, result in cached.get("packages", {}).items():
+            if num not in numbers:
+                continue
+            data[num] = {**result, "restored": True}
+            self.scheduler.restore(
+                num, result, dt_util.parse_datetime(changed_at.get(num) or ""), num in pushed
+            )
+        self.data = data
+        self._track_changes(data)
+        self.timelines.restore(await self._timeline_store.async_load() or {}, numbers)
 
-        results: Dict[str, Any] = {}
-        for coro in tasks:
+    def _track_changes(self, results: Dict[str, Any], numbers: Optional[Iterable[str]] = None) -> None:
+        """Work out whose visible data changed; only among ``numbers`` if given."""
+        if numbers is None:
+            numbers = results.keys() | self._fingerprints.keys()
+        self.changed_numbers = set()
+        for num in numbers:
+            result = results.get(num)
+            fingerprint = None if result is None else _fingerprint(result)
+            if fingerprint == self._fingerprints.get(num):
+                continue
+            self.changed_numbers.add(num)
+            if fingerprint is None:
+                del self._fingerprints[num]
+            else:
+                self._fingerprints[num] = fingerprint
+        for num in self.changed_numbers:
+            self.index.update(num, results.get(num), self.scheduler.last_changed(num))
+
+    def _cache_payload(self) -> Dict[str, Any]:
+        packages = {
+            num: {k: v for k, v in result.items() if k != "restored"}
+            for num, result in (self.data or {}).items()
+        }
+        return {
+            "packages": packages,
+            "changed_at": self.scheduler.changed_at(),
+            "pushed": self.scheduler.pushed(),
+        }
+
+    def _merge_events(self, result: Dict[str, Any]) -> None:
+        """Move a result's carrier events into the package timeline."""
+        events = result.pop("events", None)
+        if not events:
+            return
+        num = result["number"]
+        added, fresh = self.timelines.merge(num, events)
+        if not added:
+            return
+        self._timeline_store.async_delay_save(self.timelines.as_dict, CACHE_SAVE_DELAY_SEC)
+        # Back-filled history isn't news; only events past the previous newest one are
+        for at, status, detail in fresh:
+            self.hass.bus.async_fire(EVENT_TRACKING_EVENT, {
+                "carrier": result["carrier"], "number": num, "at": at, "status": status, "detail": detail,
+            })
+
+    @staticmethod
+    def _error_result(pkg: dict, err: Any) -> Dict[str, Any]:
+        return {
+            "carrier": pkg["carrier"],
+            "number": pkg["number"],
+            "detail": f"Error: {err}",
+            "short": SHORT_IN_TRANSIT,
+            "last_update": None,
+        }
+
+    async def _async_fetch(self, carrier: str, number: str) -> Dict[str, Any]:
+        # Concurrent requests for the same package share one fetch
+        return await self._flights.run((carrier, number), lambda: self._async_fetch_once(carrier, number))
+
+    async def _async_fetch_once(self, carrier: str, number: str) -> Dict[str, Any]:
+        breaker = self.breakers[carrier]
+        async with self._limits[carrier]:
+            if not breaker.allow():
+                self.metrics.increment(carrier, COUNT_SKIPPED)
+                raise CircuitOpenError(carrier)
             try:
-                data = await coro
-                results[data["number"]] = data
-            except Exception as err:  # noqa: BLE001
-                # We keep the old data if any; mark error in detail
-                num = getattr(coro, "__name__", "unknown")
-                results[num] = {"detail": f"Error: {err}", "short": "In transit"}
+                # Waiting for a token doesn't count against the fetch timeout
+                await self._buckets[carrier].acquire()
+                coro = CARRIER_FETCHERS[carrier](self.http, number, self.browser_pool, self.metrics)
+                with self.metrics.timed(carrier, PHASE_FETCH):
+                    result = await asyncio.wait_for(coro, CARRIER_TIMEOUT_SEC[carrier])
+            except asyncio.TimeoutError:
+                self.metrics.increment(carrier, COUNT_TIMEOUTS)
+                breaker.record_failure()
+                raise
+            except Exception:
+                # Cancellation (unload, shutdown) isn't the carrier's fault
+                self.metrics.increment(carrier, COUNT_ERRORS)
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+
+    async def _async_fetch_and_publish(self, pkgs: List[dict]) -> None:
+        """Fetch ``pkgs`` concurrently, publishing each one as soon as it's in.
+
+        A slow fetch (a Chrome cold start) then doesn't hold back the others.
+        """
+        now = dt_util.utcnow()
+        start = time.perf_counter()
+        await asyncio.gather(*(self._async_fetch_one(p, now) for p in pkgs))
+        if pkgs:
+            self.metrics.observe(CARRIER_ALL, PHASE_CYCLE, (time.perf_counter() - start) * 1000)
+
+    async def _async_fetch_one(self, pkg: dict, now: datetime) -> None:
+        num = pkg["number"]
+        started = self._generations[num]
+        try:
+            data: Any = await self._async_fetch(pkg["carrier"], num)
+        except asyncio.CancelledError as err:
+            # A cancelled shared fetch is a failed one; our own cancellation goes on up
+            if asyncio.current_task().cancelling():
+                raise
+            data = err
+        except Exception as err:
+            data = err
+        if self._generations[num] != started:
+            # Replaced while this ran (a push, a refresh): what this fetch brought is older
+            return
 
+        if not isinstance(data, BaseException):
+            self._merge_events(data)
+            self.scheduler.record(num, data, now)
+            self._async_merge_results({num: data})
+            return
+        if isinstance(data, CircuitOpenError):
+            # Not attempted: keep the old result and stay due for the next tick
+            if num not in (self.data or {}):
+                self._async_merge_results({num: self._error_result(pkg, "carrier temporarily unavailable")})
+            return
+        self.scheduler.record_failure(num, now)
+        err = "timeout" if isinstance(data, asyncio.TimeoutError) else data
+        _LOGGER.warning("Failed to update %s package %s: %s", pkg["carrier"], num, err)
+        # Keep the old data if any; otherwise mark the error in detail
+        if num not in (self.data or {}):
+            self._async_merge_results({num: self._error_result(pkg, err)})
+
+    def _publish(self, results: Dict[str, Any], numbers: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Track what changed; ``numbers`` are the packages just fetched, pushed or dropped."""
+        self._track_changes(results, numbers)
+        # An idle tick must not rewrite the cache file (SD cards)
+        if numbers or self.changed_numbers:
+            self._store.async_delay_save(self._cache_payload, CACHE_SAVE_DELAY_SEC)
         return results
+
+    @callback
+    def _async_merge_results(self, results: Dict[str, Any], dropped: Iterable[str] = ()) -> None:
+        """Publish ``results`` on top of the current data, leaving other packages alone."""
+        dropped = set(dropped)
+        if not results and not dropped:
+            return
+        data = dict(self.data or {})
+        for num in dropped:
+            data.pop(num, None)
+            self._generations[num] += 1
+        for num, result in results.items():
+            data[num] = result
+            self._generations[num] += 1
+        # Unlike async_set_updated_data this leaves the scheduled tick alone, so
+        # frequent partial updates can't keep pushing back polling of the rest
+        self.data = self._publish(data, results.keys() | dropped)
+        self.async_update_listeners()
+
+    async def _async_update_data(self) -> Dict[str, Any]:
+        pkgs = {p["number"]: p for p in self.packages if p["carrier"] in CARRIER_FETCHERS}
+        due = [pkgs[n] for n in self.scheduler.due(pkgs, dt_util.utcnow())]
+        # Each result is merged into the data as it is then, not as it was when
+        # the tick started: pushes and refreshes may land while these are fetched
+        await self._async_fetch_and_publish(due)
+
+        tracked = {p["number"] for p in self.packages if p["carrier"] in CARRIER_FETCHERS}
+        results: Dict[str, Any] = {}
+        for num, result in (self.data or {}).items():
+            if num not in tracked:
+                continue
+            # Whatever the first cycle didn't refetch (terminal packages never are) is now current data
+            if result.get("restored"):
+                result = {k: v for k, v in result.items() if k != "restored"}
+            results[num] = result
+        self.data = self._publish(results)
+        await self._async_archive_delivered(results)
+        # Anything pushed during the archive write is already in self.data
+        return self.data
+
+    async def _async_archive_delivered(self, results: Dict[str, Any]) -> None:
+        """Move packages delivered more than the retention period ago into the archive."""
+        days = self.entry.options.get(CONF_ARCHIVE_AFTER_DAYS, DEFAULT_ARCHIVE_AFTER_DAYS)
+        if not days:
+            return
+        now = dt_util.utcnow()
+        expired = self.index.delivered_before(now - timedelta(days=days))
+        packages = dict(self.entry.options.get(CONF_PACKAGES, {}))
+        expired = {n: at for n, at in expired.items() if n in packages}
+        if not expired:
+            return
+        await self.archive.async_append([
+            {
+                **packages[n],
+                **{k: results.get(n, {}).get(k) for k in ("short", "detail")},
+                "delivered_at": at.isoformat(),
+                "archived_at": now.isoformat(),
+            }
+            for n, at in expired.items()
+        ])
+        for n in expired:
+            packages.pop(n)
+        _LOGGER.debug("Archiving %d delivered packages", len(expired))
+        # The update listener drops their data and entities
+        self.hass.config_entries.async_update_entry(
+            self.entry, options={**self.entry.options, CONF_PACKAGES: packages}
+        )
+
+    def async_push_result(self, result: Dict[str, Any]) -> bool:
+        """Apply a result the carrier pushed to us; ``False`` if the package isn't tracked."""
+        num = result["number"]
+        pkg = next((p for p in self.packages if p["number"] == num), None)
+        if pkg is None or pkg["carrier"] != result["carrier"]:
+            return False
+        # Don't hand out a cached poll result older than this push
+        self._flights.forget((pkg["carrier"], num))
+        self._merge_events(result)
+        self.scheduler.record(num, result, dt_util.utcnow(), pushed=True)
+        self._async_merge_results({num: result})
+        return True
+
+    def select_packages(
+        self, numbers: Optional[Iterable[str]] = None, carrier: Optional[str] = None, short: Optional[str] = None
+    ) -> List[str]:
+        """Tracked numbers matching all the given filters (numbers case-insensitively)."""
+        selected = [p["number"] for p in self.packages if carrier is None or p["carrier"] == carrier]
+        if numbers is not None:
+            wanted = {n.upper() for n in numbers}
+            selected = [n for n in selected if n.upper() in wanted]
+        if short is not None:
+            in_state = self.index.numbers(short)
+            selected = [n for n in selected if n in in_state]
+        return selected
+
+    async def async_refresh_packages(self, numbers: Iterable[str]) -> None:
+        """Fetch only the given packages and merge them into data, leaving the rest alone."""
+        wanted = set(numbers)
+        pkgs = [p for p in self.packages if p["number"] in wanted and p["carrier"] in CARRIER_FETCHERS]
+        if not pkgs:
+            return
+        # Pushes and tick results that land meanwhile stay; see _async_update_data
+        await self._async_fetch_and_publish(pkgs)
+
+    async def async_sync_packages(self) -> None:
+        """Apply an options change: drop removed packages and fetch only the new ones."""
+        previous, current = self._known, {p["number"]: p for p in self.packages}
+        self._known = current
+        removed = previous.keys() - current.keys()
+        added = current.keys() - previous.keys()
+        redefined = {n for n in current.keys() & previous.keys() if current[n] != previous[n]}
+        # A new carrier needs new data; a new name only needs new entities
+        refetch = added | {n for n in redefined if current[n]["carrier"] != previous[n]["carrier"]}
+        stale = removed | (refetch - added)
+
+        for num in stale:
+            self.scheduler.forget(num)
+            self.timelines.forget(num)
+            self._flights.forget((previous[num]["carrier"], num))
+        if stale:
+            self._async_merge_results({}, dropped=stale)
+            self._timeline_store.async_delay_save(self.timelines.as_dict, CACHE_SAVE_DELAY_SEC)
+        # Entities of redefined packages are rebuilt: removed, then added back
+        if removed or added or redefined:
+            async_dispatcher_send(
+                self.hass, SIGNAL_PACKAGES_UPDATED.format(self.entry.entry_id),
+                removed | redefined, [current[n] for n in added | redefined],
+            )
+        if refetch:
+            await self.async_refresh_packages(refetch)
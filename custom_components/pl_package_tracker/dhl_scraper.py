@@ -0,0 +1,270 @@
+"""DHL tracking page scraping, run as a separate worker process.
+
+    python dhl_scraper.py [page timeout in seconds]
+
+Started by browser.DhlBrowserPool, never imported by Home Assistant. Reads
+batches from stdin, one JSON object per line::
+
+    {"batch": [{"id": 1, "url": "https://www.dhl.com/...?tracking-id=..."}, ...]}
+
+and writes one JSON line per page to stdout::
+
+    {"id": 1, "detail": "...", "error": null, "timings": {"page_load": 812.3, ...}, "rss_mb": 312.5}
+
+``rss_mb`` covers the worker, chromedriver and Chrome. The parent enforces the
+memory cap and page timeouts by killing this process group, so nothing here
+tries to recover from a hung browser; the page load and element waits share
+one deadline a few seconds inside the parent's page timeout, so a slow page
+is reported as an error instead of getting the worker killed. EOF on stdin
+quits Chrome and exits.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import sys
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_PAGE_TIMEOUT_SEC = 45
+PAGE_MARGIN_SEC = 5     # left of the parent's page timeout for extraction and the reply
+
+def _norm(s: Optional[str]) -> str:
+    return (s or "").strip()
+
+def _tree_rss_mb() -> Optional[float]:
+    """RSS of this process and all its descendants, from /proc; ``None`` elsewhere."""
+    try:
+        pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return None
+    parent: Dict[int, int] = {}
+    rss: Dict[int, int] = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        parent[pid] = int(fields[1])
+        rss[pid] = int(fields[21])
+    tree, frontier = {os.getpid()}, [os.getpid()]
+    while frontier:
+        children = [pid for pid, ppid in parent.items() if ppid in frontier and pid not in tree]
+        tree.update(children)
+        frontier = children
+    return sum(rss.get(pid, 0) for pid in tree) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def _new_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+
+STATUS_CLASS = "c-tracking-result--status-copy-message"
+DATE_CLASS = "c-tracking-result--status-copy-date"
+FALLBACK_CLASSES = ("tracking-status", "status-text", "shipment-status")
+
+# Reads the status nodes in the browser, text joined like BeautifulSoup's get_text(" ", strip=True)
+_EXTRACT_JS = """
+const text = e => {
+  if (!e) return "";
+  const walker = document.createTreeWalker(e, NodeFilter.SHOW_TEXT), out = [];
+  while (walker.nextNode()) { const t = walker.currentNode.nodeValue.trim(); if (t) out.push(t); }
+  return out.join(" ");
+};
+const fallback = [...document.querySelectorAll(arguments[2])].map(text).find(t => t) || "";
+return [text(document.querySelector(arguments[0])), text(document.querySelector(arguments[1])), fallback];
+"""
+
+_TRACKING_NUMBER_SUFFIX = re.compile(r",\s*Kod nadania przesyłki:.*$")
+# Matched against the raw HTML when none of the status nodes has any text
+_FALLBACK_PATTERNS = [
+    re.compile(p, re.I) for p in (
+        # Delivery patterns
+        r"(Doręczono|W doręczeniu|W tranzycie|Nadanie|Przesyłka w drodze)",
+        r"(przesyłka doręczona do odbiorcy|the shipment has been successfully delivered)",
+
+        # In transit patterns
+        r"(przesyłka jest obsługiwana w centrum sortowania|the shipment has been processed in the parcel center)",
+        r"(przesyłka przekazana kurierowi do doręczenia|the shipment has been loaded onto the delivery vehicle)",
+
+        # Initial status patterns
+        r"(przesyłka przyjęta w terminalu nadawczym dhl)",
+
+        # Generic patterns
+        r"(Delivered|Out for delivery|In transit|Shipment picked up)",
+        r"Status:?\s*([^<>\n]+)",
+    )
+]
+
+# Checks that a class name found in the page sits in the class attribute of the tag opened at "<"
+_CLASS_ATTR = re.compile(r"<[a-zA-Z][^>]*\sclass\s*=\s*[\"']?(?:[^\"'>]*\s)?\Z")
+
+_VOID_TAGS = {"area", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class _ElementText(HTMLParser):
+    """Collects the text of the element the fed markup starts with, then stops."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.done = False
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag not in _VOID_TAGS:
+            self.depth += 1
+        elif self.depth == 0:
+            self.done = True
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        if self.depth == 0:
+            self.done = True
+
+    def handle_endtag(self, tag: str) -> None:
+        self.depth -= 1
+        if self.depth <= 0:
+            self.done = True
+
+    def handle_data(self, data: str) -> None:
+        if not self.done and self.depth > 0:
+            text = data.strip()
+            if text:
+                self.parts.append(text)
+
+_CHUNK = 2048
+
+def _tag_starts(html: str, cls: str) -> Iterator[int]:
+    """Offsets of the tags carrying class ``cls``; str.find does the scanning."""
+    end = len(cls)
+    i = html.find(cls)
+    while i >= 0:
+        start = html.rfind("<", 0, i)
+        after = html[i + end:i + end + 1]
+        if start >= 0 and not (after.isalnum() or after in "-_") and _CLASS_ATTR.match(html[start:i]):
+            yield start
+        i = html.find(cls, i + end)
+
+def _element_texts(html: str, cls: str) -> Iterator[Tuple[int, str]]:
+    """(position, text) of each element with class ``cls``, parsing only that element's markup."""
+    for start in _tag_starts(html, cls):
+        parser = _ElementText()
+        pos = start
+        while not parser.done and pos < len(html):
+            parser.feed(html[pos:pos + _CHUNK])
+            pos += _CHUNK
+        yield start, " ".join(parser.parts)
+
+def _first_text(html: str, cls: str) -> str:
+    return next((text for _, text in _element_texts(html, cls) if text), "")
+
+def _compose(status_text: str, date_text: str) -> str:
+    # Remove tracking number if present
+    status_text = _norm(_TRACKING_NUMBER_SUFFIX.sub("", status_text))
+    date_text = _norm(date_text)
+    return f"{status_text} ({date_text})" if date_text else status_text
+
+def extract_status(html: str) -> str:
+    """Status detail from a rendered DHL page, without parsing the whole document."""
+    status_text = _first_text(html, STATUS_CLASS)
+    if status_text:
+        return _compose(status_text, _first_text(html, DATE_CLASS))
+
+    # Fallback to other status elements, in document order
+    found = sorted(hit for cls in FALLBACK_CLASSES for hit in _element_texts(html, cls) if hit[1])
+    if found:
+        return _compose(found[0][1], "")
+
+    for pattern in _FALLBACK_PATTERNS:
+        m = pattern.search(html)
+        if m:
+            return _compose(m.group(1), "")
+    return "Unknown / parsing failed"
+
+def scrape_dhl(driver, url: str, budget: float) -> Tuple[str, Dict[str, float]]:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    start = time.perf_counter()
+    deadline = start + budget
+
+    def remaining() -> float:
+        return max(1.0, deadline - time.perf_counter())
+
+    # Navigate to the tracking page, reusing the worker's tab
+    driver.set_page_load_timeout(remaining())
+    driver.get(url)
+
+    # Wait for and click the submit button
+    submit_button = WebDriverWait(driver, remaining()).until(
+        EC.element_to_be_clickable((By.CSS_SELECTOR, ".js--tracking--input-submit"))
+    )
+    submit_button.click()
+
+    # Wait for status message element
+    WebDriverWait(driver, remaining()).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, f".{STATUS_CLASS}"))
+    )
+    loaded = time.perf_counter()
+
+    # Only the status nodes cross the WebDriver connection, not the whole page
+    status_text, date_text, fallback_text = driver.execute_script(
+        _EXTRACT_JS, f".{STATUS_CLASS}", f".{DATE_CLASS}", ", ".join(f".{c}" for c in FALLBACK_CLASSES)
+    )
+    if status_text:
+        detail = _compose(status_text, date_text)
+    elif fallback_text:
+        detail = _compose(fallback_text, "")
+    else:
+        detail = extract_status(driver.page_source)
+    timings = {"page_load": (loaded - start) * 1000, "parse": (time.perf_counter() - loaded) * 1000}
+    return detail, timings
+
+def _reply(**fields: Any) -> None:
+    sys.stdout.write(json.dumps(fields, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def main(page_timeout: float) -> None:
+    budget = max(1.0, page_timeout - PAGE_MARGIN_SEC)
+    driver = None
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            for page in json.loads(line)["batch"]:
+                timings: Dict[str, float] = {}
+                detail, error = None, None
+                try:
+                    if driver is None:
+                        start = time.perf_counter()
+                        driver = _new_driver()
+                        timings["browser_start"] = (time.perf_counter() - start) * 1000
+                    detail, page_timings = scrape_dhl(driver, page["url"], budget)
+                    timings.update(page_timings)
+                except Exception as err:  # noqa: BLE001
+                    error = f"{type(err).__name__}: {err}"
+                    # The browser may be in any state after a failure; start fresh next time
+                    if driver is not None:
+                        try:
+                            driver.quit()
+                        except Exception:  # noqa: BLE001
+                            pass
+                        driver = None
+                _reply(id=page["id"], detail=detail, error=error, timings=timings, rss_mb=_tree_rss_mb())
+    finally:
+        if driver is not None:
+            driver.quit()
+
+if __name__ == "__main__":
+    # Run as a script, the integration directory is first on sys.path; keep its modules out of the way
+    sys.path.pop(0)
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PAGE_TIMEOUT_SEC)
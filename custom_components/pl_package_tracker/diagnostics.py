@@ -0,0 +1,23 @@
+
+from __future__ import annotations
+from collections import Counter
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN
+from .coordinator import PackageDataCoordinator
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    coordinator: PackageDataCoordinator = hass.data[DOMAIN][entry.entry_id]
+    data = coordinator.data or {}
+    # Tracking numbers are left out on purpose; counts are enough to debug slowness
+    return {
+        "packages": len(coordinator.packages),
+        "by_carrier": dict(Counter(r.get("carrier") for r in data.values())),
+        "by_short": dict(Counter(r.get("short") for r in data.values())),
+        "by_source": dict(Counter(r.get("source") for r in data.values())),
+        "last_update_success": coordinator.last_update_success,
+        "metrics": coordinator.metrics.as_dict(),
+        "circuit_breakers": {carrier: b.as_dict() for carrier, b in coordinator.breakers.items()},
+    }
@@ -0,0 +1,95 @@
+
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from homeassistant.core import HomeAssistant
+from homeassistant.util import ssl as ssl_util
+
+from .const import (
+    HTTP_CONNECT_TIMEOUT_SEC, HTTP_READ_TIMEOUT_SEC, HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_SEC, HTTP_KEEPALIVE_SEC, HTTP_VALIDATOR_CACHE_SIZE,
+)
+from .metrics import FetchMetrics, COUNT_NOT_MODIFIED
+
+class _Validated(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    value: Any
+
+class CarrierHttpClient:
+    """Keep-alive HTTP session for the carrier APIs, with conditional GETs.
+
+    Kept apart from Home Assistant's shared session so carrier requests get
+    their own connection limits, DNS cache and timeouts. A 200 response with
+    an ETag or Last-Modified header is remembered with its parsed value; the
+    next request for that URL is conditional, and a 304 returns the remembered
+    value without downloading or decoding a body.
+    """
+
+    def __init__(self, hass: HomeAssistant, metrics: FetchMetrics) -> None:
+        self._hass = hass
+        self.metrics = metrics
+        self._session: Optional[ClientSession] = None
+        self._validated: "OrderedDict[str, _Validated]" = OrderedDict()
+
+    @property
+    def session(self) -> ClientSession:
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_SEC,
+                keepalive_timeout=HTTP_KEEPALIVE_SEC,
+                enable_cleanup_closed=True,
+                ssl=ssl_util.get_default_context(),
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(connect=HTTP_CONNECT_TIMEOUT_SEC, sock_read=HTTP_READ_TIMEOUT_SEC),
+                # aiohttp decompresses these transparently
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+        return self._session
+
+    async def get_json(
+        self, carrier: str, url: str, parse: Callable[[Any], Any], headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Any]:
+        """GET ``url`` and return ``(status, parse(json))``.
+
+        A 304 returns ``(304, value)`` with the value parsed from the last 200;
+        any other non-200 status returns ``(status, None)``.
+        """
+        headers = dict(headers or {})
+        cached = self._validated.get(url)
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        async with self.session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached is not None:
+                self._validated.move_to_end(url)
+                self.metrics.increment(carrier, COUNT_NOT_MODIFIED)
+                return 304, cached.value
+            if resp.status != 200:
+                return resp.status, None
+            data = await resp.json(content_type=None)
+            etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+        value = parse(data)
+        if value is not None and (etag or last_modified):
+            self._validated[url] = _Validated(etag, last_modified, value)
+            self._validated.move_to_end(url)
+            while len(self._validated) > HTTP_VALIDATOR_CACHE_SIZE:
+                self._validated.popitem(last=False)
+        else:
+            self._validated.pop(url, None)
+        return 200, value
+
+    async def async_close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+        self._validated.clear()
@@ -0,0 +1,61 @@
+
+from __future__ import annotations
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .const import SHORT_DELIVERED
+
+# InPost statuses meaning the parcel is waiting in a locker / pickup point
+INPOST_PICKUP_STATUSES = {
+    "ready_to_pickup",
+    "stack_in_box_machine",
+    "stack_in_customer_service_point",
+}
+
+class StatusIndex:
+    """Tracking numbers grouped by short status and carrier.
+
+    Updated one package at a time as results change, so aggregate sensors
+    can read counts without scanning coordinator.data.
+    """
+
+    def __init__(self) -> None:
+        # (short, None) -> all numbers in that state; (short, carrier) -> per carrier
+        self._groups: Dict[Tuple[str, Optional[str]], Set[str]] = defaultdict(set)
+        self._keys: Dict[str, Tuple[str, str]] = {}
+        self.awaiting_pickup: Set[str] = set()
+        self._delivered_at: Dict[str, datetime] = {}
+
+    def count(self, short: str, carrier: Optional[str] = None) -> int:
+        return len(self._groups.get((short, carrier), ()))
+
+    def numbers(self, short: str, carrier: Optional[str] = None) -> Set[str]:
+        return self._groups.get((short, carrier), set())
+
+    def delivered_since(self, cutoff: datetime) -> int:
+        return sum(1 for at in self._delivered_at.values() if at >= cutoff)
+
+    def delivered_before(self, cutoff: datetime) -> Dict[str, datetime]:
+        return {num: at for num, at in self._delivered_at.items() if at < cutoff}
+
+    def update(self, number: str, result: Optional[Dict[str, Any]], changed_at: Optional[datetime]) -> None:
+        """Re-file one package; ``result=None`` removes it."""
+        old = self._keys.pop(number, None)
+        if old is not None:
+            short, carrier = old
+            self._groups[(short, None)].discard(number)
+            self._groups[(short, carrier)].discard(number)
+        self.awaiting_pickup.discard(number)
+        self._delivered_at.pop(number, None)
+        if result is None:
+            return
+
+        short, carrier = result.get("short"), result.get("carrier")
+        self._keys[number] = (short, carrier)
+        self._groups[(short, None)].add(number)
+        self._groups[(short, carrier)].add(number)
+        if result.get("status_code") in INPOST_PICKUP_STATUSES:
+            self.awaiting_pickup.add(number)
+        if short == SHORT_DELIVERED and changed_at is not None:
+            self._delivered_at[number] = changed_at
@@ -0,0 +1,96 @@
+
+from __future__ import annotations
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Timed phases
+PHASE_BROWSER_START = "browser_start"
+PHASE_PAGE_LOAD = "page_load"
+PHASE_PARSE = "parse"
+PHASE_HTTP = "http"
+PHASE_FETCH = "fetch"   # whole fetch of one package, as seen by the coordinator
+PHASE_CYCLE = "cycle"   # whole refresh cycle, recorded under carrier "all"
+
+# Counters
+COUNT_ERRORS = "errors"
+COUNT_TIMEOUTS = "timeouts"
+COUNT_FALLBACKS = "fallbacks"
+COUNT_SKIPPED = "skipped_circuit_open"
+COUNT_NOT_MODIFIED = "not_modified"  # conditional request answered with 304
+COUNT_WORKER_KILLS = "worker_kills"   # browser worker killed for a hung page or its memory use
+
+CARRIER_ALL = "all"
+
+class Histogram:
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+
+    @property
+    def mean_ms(self) -> Optional[float]:
+        return self.total_ms / self.count if self.count else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        bounds = [str(b) for b in BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean_ms, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1),
+            "buckets_ms": dict(zip(bounds, self.buckets)),
+        }
+
+class FetchMetrics:
+    """Per-carrier timing histograms and error counters for the fetch path.
+
+    Only touched from the event loop: browser phases arrive in the worker
+    processes' replies, so no locking is needed.
+    """
+
+    def __init__(self) -> None:
+        self._histograms: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self._counters: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def observe(self, carrier: str, phase: str, ms: float) -> None:
+        self._histograms[(carrier, phase)].observe(ms)
+
+    def increment(self, carrier: str, counter: str) -> None:
+        self._counters[(carrier, counter)] += 1
+
+    @contextmanager
+    def timed(self, carrier: str, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(carrier, phase, (time.perf_counter() - start) * 1000)
+
+    def histogram(self, carrier: str, phase: str) -> Optional[Histogram]:
+        return self._histograms.get((carrier, phase))
+
+    def counter(self, carrier: str, counter: str) -> int:
+        return self._counters.get((carrier, counter), 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for (carrier, phase), hist in self._histograms.items():
+            out.setdefault(carrier, {}).setdefault("timings", {})[phase] = hist.as_dict()
+        for (carrier, counter), value in self._counters.items():
+            out.setdefault(carrier, {}).setdefault("counters", {})[counter] = value
+        return out
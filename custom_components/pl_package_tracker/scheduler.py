@@ -0,0 +1,116 @@
+
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from homeassistant.util import dt as dt_util
+from .const import (
+    SHORT_LABEL_CREATED, SHORT_OUT_FOR_DELIVERY, SHORT_DELIVERED,
+    POLL_OUT_FOR_DELIVERY_MIN, POLL_IN_TRANSIT_MIN, POLL_LABEL_CREATED_MIN,
+    POLL_STALE_MIN, POLL_DORMANT_MIN, POLL_NIGHT_MIN,
+    STALE_AFTER_HOURS, DORMANT_AFTER_HOURS, NIGHT_START_HOUR, NIGHT_END_HOUR,
+    FAILURE_BACKOFF_MAX_MIN, POLL_PUSH_SAFETY_MIN,
+)
+from .throttle import backoff
+
+def is_terminal(data: Dict[str, Any]) -> bool:
+    return data.get("short") == SHORT_DELIVERED or bool(data.get("final"))
+
+def poll_interval(data: Dict[str, Any], since_change: timedelta, now: datetime) -> Optional[timedelta]:
+    """How long to wait before polling a package again; ``None`` means never."""
+    if is_terminal(data):
+        return None
+
+    short = data.get("short")
+    if short == SHORT_OUT_FOR_DELIVERY:
+        minutes = POLL_OUT_FOR_DELIVERY_MIN
+    elif short == SHORT_LABEL_CREATED:
+        minutes = POLL_LABEL_CREATED_MIN
+    elif since_change >= timedelta(hours=DORMANT_AFTER_HOURS):
+        minutes = POLL_DORMANT_MIN
+    elif since_change >= timedelta(hours=STALE_AFTER_HOURS):
+        minutes = POLL_STALE_MIN
+    else:
+        minutes = POLL_IN_TRANSIT_MIN
+
+    # Couriers don't move parcels at night
+    hour = dt_util.as_local(now).hour
+    if hour >= NIGHT_START_HOUR or hour < NIGHT_END_HOUR:
+        minutes = max(minutes, POLL_NIGHT_MIN)
+
+    return timedelta(minutes=minutes)
+
+class PollScheduler:
+    """Keeps a next-due time per tracking number."""
+
+    def __init__(self) -> None:
+        self._next_due: Dict[str, datetime] = {}
+        self._changed_at: Dict[str, datetime] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._failures: Dict[str, int] = {}
+        # Numbers the carrier pushes updates for
+        self._pushed: Set[str] = set()
+
+    def due(self, numbers: Iterable[str], now: datetime) -> List[str]:
+        numbers = list(numbers)
+        # Drop state for packages that are no longer tracked
+        for gone in set(self._next_due) - set(numbers):
+            self.forget(gone)
+        return [n for n in numbers if n not in self._next_due or self._next_due[n] <= now]
+
+    def record(self, number: str, data: Dict[str, Any], now: datetime, pushed: bool = False) -> None:
+        """Schedule the next poll after a successful fetch or a pushed update."""
+        if pushed:
+            self._pushed.add(number)
+        prev = self._last.get(number)
+        if prev is None or prev.get("detail") != data.get("detail"):
+            self._changed_at[number] = now
+        self._last[number] = data
+        self._failures.pop(number, None)
+        self._schedule(number, now)
+
+    def restore(
+        self, number: str, data: Dict[str, Any], changed_at: Optional[datetime], pushed: bool = False
+    ) -> None:
+        """Seed state from a cached result so restarts don't refetch everything."""
+        fetched_at = dt_util.parse_datetime(data.get("last_update") or "")
+        if fetched_at is None:
+            return
+        if pushed:
+            self._pushed.add(number)
+        self._changed_at[number] = changed_at or fetched_at
+        self._last[number] = data
+        self._schedule(number, fetched_at)
+
+    def last_changed(self, number: str) -> Optional[datetime]:
+        return self._changed_at.get(number)
+
+    def changed_at(self) -> Dict[str, str]:
+        return {n: t.isoformat() for n, t in self._changed_at.items()}
+
+    def pushed(self) -> List[str]:
+        return sorted(self._pushed)
+
+    def record_failure(self, number: str, now: datetime) -> None:
+        """Retry a failed package later, backing off while it keeps failing."""
+        self._failures[number] = self._failures.get(number, 0) + 1
+        self._schedule(number, now)
+
+    def _schedule(self, number: str, now: datetime) -> None:
+        data = self._last.get(number, {})
+        since_change = now - self._changed_at.get(number, now)
+        interval = poll_interval(data, since_change, now)
+        if number in self._pushed and interval is not None:
+            interval = max(interval, timedelta(minutes=POLL_PUSH_SAFETY_MIN))
+        failures = self._failures.get(number)
+        if failures and interval is not None:
+            base = interval.total_seconds() / 60
+            interval = timedelta(minutes=backoff(base, failures, max(base, FAILURE_BACKOFF_MAX_MIN)))
+        self._next_due[number] = datetime.max.replace(tzinfo=now.tzinfo) if interval is None else now + interval
+
+    def forget(self, number: str) -> None:
+        self._next_due.pop(number, None)
+        self._changed_at.pop(number, None)
+        self._last.pop(number, None)
+        self._failures.pop(number, None)
+        self._pushed.discard(number)
@@ -1,37 +1,92 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from .const import DOMAIN, CONF_PACKAGES, CARRIER_DHL, CARRIER_INPOST
+from homeassistant.util import dt as dt_util
+from .const import (
+    DOMAIN, CONF_PACKAGES, CARRIER_DHL, CARRIER_INPOST,
+    SHORT_IN_TRANSIT, SHORT_OUT_FOR_DELIVERY, SIGNAL_PACKAGES_UPDATED,
+)
 
 from .coordinator import PackageDataCoordinator
+from .metrics import (
+    CARRIER_ALL, PHASE_CYCLE, PHASE_FETCH, PHASE_HTTP, PHASE_BROWSER_START, PHASE_PAGE_LOAD,
+    PHASE_PARSE, COUNT_ERRORS, COUNT_TIMEOUTS, COUNT_FALLBACKS, COUNT_SKIPPED, COUNT_WORKER_KILLS,
+    COUNT_NOT_MODIFIED,
+)
 
 ATTR_CARRIER = "carrier"
 ATTR_NUMBER = "tracking_number"
-ATTR_LAST_UPDATE = "last_update"
-ATTR_DETAIL = "detail"
+ATTR_SOURCE = "source"
+ATTR_RESTORED = "restored"
+ATTR_RESTORED_AT = "restored_at"
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities) -> None:
-    coordinator = PackageDataCoordinator(hass, entry)
-    await coordinator.async_config_entry_first_refresh()
+    coordinator: PackageDataCoordinator = hass.data[DOMAIN][entry.entry_id]
+    by_number: dict[str, list[BasePackageSensor]] = {}
 
-    entities = []
-    for pkg in coordinator.packages:
-        entities.append(PackageDetailSensor(coordinator, entry, pkg))
-        entities.append(PackageShortSensor(coordinator, entry, pkg))
+    def _package_entities(pkgs: list[dict]) -> list[BasePackageSensor]:
+        new = []
+        for pkg in pkgs:
+            by_number[pkg["number"]] = [
+                PackageDetailSensor(coordinator, entry, pkg),
+                PackageShortSensor(coordinator, entry, pkg),
+                PackageLastChangeSensor(coordinator, entry, pkg),
+            ]
+            new.extend(by_number[pkg["number"]])
+        return new
+
+    async def _async_packages_updated(removed: set[str], added: list[dict]) -> None:
+        ent_reg = er.async_get(hass)
+        dev_reg = dr.async_get(hass)
+        tracked = {p["number"] for p in coordinator.packages}
+        old = {num: by_number.pop(num, []) for num in removed}
+        new = _package_entities(added)
+        # A renamed package comes straight back with the same unique_ids; a new carrier changes them
+        kept = {entity.unique_id for entity in new}
+        for num, entities in old.items():
+            for entity in entities:
+                await entity.async_remove()
+                if entity.unique_id not in kept and entity.entity_id and ent_reg.async_get(entity.entity_id):
+                    ent_reg.async_remove(entity.entity_id)
+            device = dev_reg.async_get_device(identifiers={(DOMAIN, entry.entry_id, num)})
+            if num not in tracked and device is not None:
+                dev_reg.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+        if new:
+            async_add_entities(new)
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_PACKAGES_UPDATED.format(entry.entry_id), _async_packages_updated)
+    )
+
+    entities = _package_entities(coordinator.packages)
 
     entities.append(PackagesTodayAggregateSensor(coordinator, entry))
+    entities.append(PackagesInTransitAggregateSensor(coordinator, entry))
+    entities.append(PackagesAwaitingPickupAggregateSensor(coordinator, entry))
+    entities.append(PackagesDeliveredRecentlyAggregateSensor(coordinator, entry))
+
+    entities.append(RefreshCycleTimeSensor(coordinator, entry))
+    for carrier in (CARRIER_DHL, CARRIER_INPOST):
+        entities.append(CarrierFetchTimeSensor(coordinator, entry, carrier))
+        entities.append(CarrierErrorsSensor(coordinator, entry, carrier))
 
-    async_add_entities(entities, True)
+    async_add_entities(entities)
 
 class BasePackageSensor(CoordinatorEntity[PackageDataCoordinator], SensorEntity):
+    # Fixed per package or only meaningful right now; kept out of the recorder's history
+    _unrecorded_attributes = frozenset({ATTR_CARRIER, ATTR_NUMBER, ATTR_RESTORED, ATTR_RESTORED_AT})
+
     def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry, pkg: dict | None = None) -> None:
         super().__init__(coordinator)
         self._entry = entry
@@ -55,18 +110,33 @@ class BasePackageSensor(CoordinatorEntity[PackageDataCoordinator], SensorEntity)
             model="Tracking"
         )
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Only write state when this package's visible data actually changed
+        changed = self.coordinator.changed_numbers
+        if self._pkg is None:
+            if changed:
+                self.async_write_ha_state()
+        elif self._pkg["number"] in changed:
+            self.async_write_ha_state()
+
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         if not self._pkg:
             return {}
         num = self._pkg["number"]
         data = self.coordinator.data.get(num) or {}
-        return {
+        # The detail text is the state of the detailed status sensor only, so it's recorded once
+        attrs = {
             ATTR_CARRIER: self._pkg["carrier"],
             ATTR_NUMBER: num,
-            ATTR_LAST_UPDATE: data.get("last_update"),
-            ATTR_DETAIL: data.get("detail"),
+            ATTR_SOURCE: data.get("source"),
+            ATTR_RESTORED: data.get("restored", False),
         }
+        # How old a cached result is; only while it is one, so polls never change the attributes
+        if data.get("restored"):
+            attrs[ATTR_RESTORED_AT] = data.get("last_update")
+        return attrs
 
 class PackageDetailSensor(BasePackageSensor):
     _attr_icon = "mdi:package-variant-closed"
@@ -102,6 +172,24 @@ class PackageShortSensor(BasePackageSensor):
         data = self.coordinator.data.get(self._pkg["number"]) or {}
         return data.get("short")
 
+class PackageLastChangeSensor(BasePackageSensor):
+    _attr_icon = "mdi:clock-check-outline"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    @property
+    def name(self) -> str:
+        name = self._pkg.get("name") or self._pkg["number"]
+        return f"{name} – last status change"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_{self._pkg['carrier']}_{self._pkg['number']}_changed"
+
+    @property
+    def native_value(self) -> datetime | None:
+        # Moves only when the detail text changes, not on every poll
+        return self.coordinator.scheduler.last_changed(self._pkg["number"])
+
 class PackagesTodayAggregateSensor(BasePackageSensor):
     _attr_icon = "mdi:calendar-today"
     def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry) -> None:
@@ -117,28 +205,170 @@ class PackagesTodayAggregateSensor(BasePackageSensor):
 
     @property
     def native_value(self) -> int | None:
-        # Count packages with short status 'In delivery Today'
-        count = 0
-        for data in (self.coordinator.data or {}).values():
-            if data.get("short") == "In delivery Today":
-                count += 1
-        return count
+        return self.coordinator.index.count(SHORT_OUT_FOR_DELIVERY)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        index = self.coordinator.index
+        return {
+            "courier_today": index.count(SHORT_OUT_FOR_DELIVERY, CARRIER_DHL),
+            "parcel_locker_today": index.count(SHORT_OUT_FOR_DELIVERY, CARRIER_INPOST),
+        }
+
+class PackagesInTransitAggregateSensor(BasePackageSensor):
+    _attr_icon = "mdi:truck-delivery"
+    def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry) -> None:
+        super().__init__(coordinator, entry, None)
+
+    @property
+    def name(self) -> str:
+        return "Packages in transit"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_aggregate_in_transit"
+
+    @property
+    def native_value(self) -> int | None:
+        return self.coordinator.index.count(SHORT_IN_TRANSIT)
+
+class PackagesAwaitingPickupAggregateSensor(BasePackageSensor):
+    _attr_icon = "mdi:locker-multiple"
+    def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry) -> None:
+        super().__init__(coordinator, entry, None)
+
+    @property
+    def name(self) -> str:
+        return "Packages awaiting pickup"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_aggregate_awaiting_pickup"
+
+    @property
+    def native_value(self) -> int | None:
+        return len(self.coordinator.index.awaiting_pickup)
+
+class PackagesDeliveredRecentlyAggregateSensor(BasePackageSensor):
+    _attr_icon = "mdi:package-variant-closed-check"
+    def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry) -> None:
+        super().__init__(coordinator, entry, None)
+
+    @property
+    def name(self) -> str:
+        return "Packages delivered in the last 24h"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_aggregate_delivered_24h"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # The 24h window moves on its own; HA drops the write if the count is unchanged
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> int | None:
+        return self.coordinator.index.delivered_since(dt_util.utcnow() - timedelta(hours=24))
+
+class BaseDiagnosticSensor(BasePackageSensor):
+    """Fetch-path metrics shown on the aggregate device."""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry) -> None:
+        super().__init__(coordinator, entry, None)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Metrics move on every tick that fetched something
+        self.async_write_ha_state()
+
+class RefreshCycleTimeSensor(BaseDiagnosticSensor):
+    _attr_icon = "mdi:timer-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+    @property
+    def name(self) -> str:
+        return "Refresh cycle time"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_diag_cycle_time"
+
+    @property
+    def native_value(self) -> float | None:
+        hist = self.coordinator.metrics.histogram(CARRIER_ALL, PHASE_CYCLE)
+        return round(hist.last_ms) if hist else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        hist = self.coordinator.metrics.histogram(CARRIER_ALL, PHASE_CYCLE)
+        if not hist:
+            return {}
+        return {"mean_ms": round(hist.mean_ms), "max_ms": round(hist.max_ms), "cycles": hist.count}
+
+class CarrierFetchTimeSensor(BaseDiagnosticSensor):
+    _attr_icon = "mdi:timer-sand"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+    def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry, carrier: str) -> None:
+        super().__init__(coordinator, entry)
+        self._carrier = carrier
+
+    @property
+    def name(self) -> str:
+        return f"{self._carrier.upper()} mean fetch time"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_diag_{self._carrier}_fetch_time"
+
+    @property
+    def native_value(self) -> float | None:
+        hist = self.coordinator.metrics.histogram(self._carrier, PHASE_FETCH)
+        return round(hist.mean_ms) if hist else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        attrs: dict[str, Any] = {}
+        for phase in (PHASE_HTTP, PHASE_BROWSER_START, PHASE_PAGE_LOAD, PHASE_PARSE):
+            hist = self.coordinator.metrics.histogram(self._carrier, phase)
+            if hist:
+                attrs[f"{phase}_mean_ms"] = round(hist.mean_ms)
+        return attrs
+
+class CarrierErrorsSensor(BaseDiagnosticSensor):
+    _attr_icon = "mdi:alert-circle-outline"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, coordinator: PackageDataCoordinator, entry: ConfigEntry, carrier: str) -> None:
+        super().__init__(coordinator, entry)
+        self._carrier = carrier
+
+    @property
+    def name(self) -> str:
+        return f"{self._carrier.upper()} fetch errors"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_diag_{self._carrier}_errors"
+
+    @property
+    def native_value(self) -> int:
+        return self.coordinator.metrics.counter(self._carrier, COUNT_ERRORS)
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        courier = 0
-        locker = 0
-        # Use package definitions to split by carrier
-        defs = {p["number"]: p for p in self.coordinator.packages}
-        for number, data in (self.coordinator.data or {}).items():
-            if data.get("short") != "In delivery Today":
-                continue
-            carrier = defs.get(number, {}).get("carrier")
-            if carrier == CARRIER_DHL:
-                courier += 1
-            elif carrier == CARRIER_INPOST:
-                locker += 1
+        metrics = self.coordinator.metrics
         return {
-            "courier_today": courier,
-            "parcel_locker_today": locker,
+            COUNT_TIMEOUTS: metrics.counter(self._carrier, COUNT_TIMEOUTS),
+            COUNT_FALLBACKS: metrics.counter(self._carrier, COUNT_FALLBACKS),
+            COUNT_SKIPPED: metrics.counter(self._carrier, COUNT_SKIPPED),
+            COUNT_NOT_MODIFIED: metrics.counter(self._carrier, COUNT_NOT_MODIFIED),
+            COUNT_WORKER_KILLS: metrics.counter(self._carrier, COUNT_WORKER_KILLS),
+            "circuit_open": self.coordinator.breakers[self._carrier].is_open,
         }
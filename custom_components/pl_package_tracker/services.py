@@ -1,8 +1,9 @@
 
 from __future__ import annotations
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
 from homeassistant.helpers.typing import ConfigType
 from .const import DOMAIN, CONF_PACKAGES
+from .tracking_numbers import merge_packages, parse_numbers
 
 async def async_setup_services(hass: HomeAssistant):
     async def _add(call: ServiceCall):
@@ -16,7 +17,18 @@ async def async_setup_services(hass: HomeAssistant):
             "name": (call.data.get("name") or "").strip()
         }
         packages[pkg["number"]] = pkg
-        hass.config_entries.async_update_entry(entry, options={CONF_PACKAGES: packages})
+        hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_PACKAGES: packages})
+
+    async def _add_many(call: ServiceCall) -> ServiceResponse:
+        entry = next((e for e in hass.config_entries.async_entries(DOMAIN)), None)
+        if not entry:
+            return None
+        packages = dict(entry.options.get(CONF_PACKAGES, {}))
+        added, existing, unrecognized = merge_packages(packages, call.data["numbers"], call.data.get("carrier"))
+        # One options write; the update listener fetches the new numbers in one batch
+        if added:
+            hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_PACKAGES: packages})
+        return {"added": added, "already_tracked": existing, "unrecognized": unrecognized}
 
     async def _remove(call: ServiceCall):
         entry = next((e for e in hass.config_entries.async_entries(DOMAIN)), None)
@@ -25,7 +37,49 @@ async def async_setup_services(hass: HomeAssistant):
         packages = dict(entry.options.get(CONF_PACKAGES, {}))
         n = call.data["number"].strip()
         packages.pop(n, None)
-        hass.config_entries.async_update_entry(entry, options={CONF_PACKAGES: packages})
+        hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_PACKAGES: packages})
+
+    async def _query_archive(call: ServiceCall) -> ServiceResponse:
+        entry = next((e for e in hass.config_entries.async_entries(DOMAIN)), None)
+        coordinator = hass.data.get(DOMAIN, {}).get(entry.entry_id) if entry else None
+        if coordinator is None:
+            return {"packages": []}
+        number = (call.data.get("number") or "").strip() or None
+        packages = await coordinator.archive.async_query(number, call.data.get("carrier"), call.data.get("limit"))
+        return {"packages": packages}
+
+    async def _get_timeline(call: ServiceCall) -> ServiceResponse:
+        entry = next((e for e in hass.config_entries.async_entries(DOMAIN)), None)
+        coordinator = hass.data.get(DOMAIN, {}).get(entry.entry_id) if entry else None
+        number = call.data["number"].strip()
+        events = coordinator.timelines.events(number) if coordinator else []
+        return {"number": number, "events": events}
+
+    async def _refresh(call: ServiceCall) -> ServiceResponse:
+        number = call.data["number"].strip()
+        refreshed = []
+        for coordinator in list(hass.data.get(DOMAIN, {}).values()):
+            selected = coordinator.select_packages([number])
+            await coordinator.async_refresh_packages(selected)
+            refreshed += selected
+        return {"refreshed": refreshed}
+
+    async def _refresh_many(call: ServiceCall) -> ServiceResponse:
+        numbers = parse_numbers(call.data["numbers"]) if call.data.get("numbers") else None
+        refreshed = []
+        # Only the selected packages are fetched; everything else keeps its data and schedule
+        for coordinator in list(hass.data.get(DOMAIN, {}).values()):
+            selected = coordinator.select_packages(numbers, call.data.get("carrier"), call.data.get("short"))
+            await coordinator.async_refresh_packages(selected)
+            refreshed += selected
+        return {"refreshed": refreshed}
 
     hass.services.async_register(DOMAIN, "add_package", _add)
+    hass.services.async_register(DOMAIN, "add_packages", _add_many, supports_response=SupportsResponse.OPTIONAL)
     hass.services.async_register(DOMAIN, "remove_package", _remove)
+    hass.services.async_register(DOMAIN, "query_archive", _query_archive, supports_response=SupportsResponse.ONLY)
+    hass.services.async_register(DOMAIN, "get_timeline", _get_timeline, supports_response=SupportsResponse.ONLY)
+    hass.services.async_register(DOMAIN, "refresh_package", _refresh, supports_response=SupportsResponse.OPTIONAL)
+    hass.services.async_register(
+        DOMAIN, "refresh_packages", _refresh_many, supports_response=SupportsResponse.OPTIONAL
+    )
@@ -0,0 +1,48 @@
+
+from __future__ import annotations
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    Callers arriving while a call for their key is running await that call's
+    result. A successful result is also handed out as-is for ``fresh_for``
+    seconds, so back-to-back requests don't refetch.
+    """
+
+    def __init__(self, fresh_for: float) -> None:
+        self._fresh_for = fresh_for
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, (at, _) in self._recent.items() if now - at >= self._fresh_for]:
+            del self._recent[key]
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        recent = self._recent.get(key)
+        if recent is not None and now - recent[0] < self._fresh_for:
+            return recent[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if not t.cancelled() and t.exception() is None:
+                    done_at = time.monotonic()
+                    self._prune(done_at)
+                    self._recent[key] = (done_at, t.result())
+
+            task.add_done_callback(_done)
+
+        # One impatient caller must not cancel the fetch for everybody else
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        self._recent.pop(key, None)
@@ -0,0 +1,91 @@
+
+from __future__ import annotations
+import asyncio
+import random
+import time
+from typing import Optional
+
+from .const import BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SEC, BREAKER_MAX_COOLDOWN_SEC
+
+def backoff(base: float, attempt: int, cap: float) -> float:
+    """Exponential backoff with +/-20% jitter; ``attempt`` starts at 1."""
+    delay = min(cap, base * 2 ** max(attempt - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+class CircuitOpenError(Exception):
+    """The carrier's circuit breaker is open; the fetch was not attempted."""
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class CircuitBreaker:
+    """Stops calling a carrier after repeated failures.
+
+    After ``threshold`` consecutive failures the breaker opens for a cooldown
+    that doubles (with jitter) every time it trips again. Once the cooldown
+    is over a single trial call is let through; its outcome closes the
+    breaker or opens it again.
+    """
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_FAILURE_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN_SEC,
+        max_cooldown: float = BREAKER_MAX_COOLDOWN_SEC,
+    ) -> None:
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._failures = 0
+        self._trips = 0
+        self._open_until: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._open_until is not None
+
+    def allow(self) -> bool:
+        if self._open_until is None:
+            return True
+        if time.monotonic() < self._open_until or self._trial_running:
+            return False
+        self._trial_running = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trips = 0
+        self._open_until = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_running or self._failures >= self._threshold:
+            self._trips += 1
+            self._open_until = time.monotonic() + backoff(self._cooldown, self._trips, self._max_cooldown)
+            self._trial_running = False
+            self._failures = 0
+
+    def as_dict(self) -> dict:
+        remaining = max(0.0, self._open_until - time.monotonic()) if self._open_until else 0.0
+        return {"open": self.is_open, "trips": self._trips, "failures": self._failures, "retry_in_s": round(remaining)}
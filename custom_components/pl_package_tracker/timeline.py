@@ -0,0 +1,101 @@
+
+from __future__ import annotations
+from bisect import insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from homeassistant.util import dt as dt_util
+from .const import TIMELINE_MAX_EVENTS
+
+# (timestamp, status code, detail text)
+Event = Tuple[str, str, str]
+
+class PackageTimeline:
+    """Carrier events of one package, oldest first, capped at ``maxlen``.
+
+    Events are deduplicated by (timestamp, status) and kept sorted, so a poll
+    bringing older history after a push slots it in before the pushed event.
+    Once full, events older than the oldest one kept are ignored: they would
+    be dropped again straight away, and re-fetching a long history must not
+    count them as new.
+    """
+
+    __slots__ = ("_events", "_keys", "_maxlen")
+
+    def __init__(self, events: Iterable[Event] = (), maxlen: int = TIMELINE_MAX_EVENTS) -> None:
+        self._events: List[Event] = []
+        self._keys: Set[Tuple[str, str]] = set()
+        self._maxlen = maxlen
+        self.merge(events)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def newest(self) -> Optional[Event]:
+        return self._events[-1] if self._events else None
+
+    def merge(self, events: Iterable[Event]) -> List[Event]:
+        """Add the events not seen yet; returns the ones kept, oldest first."""
+        incoming = {(e[0], e[1]): e for e in events if (e[0], e[1]) not in self._keys}
+        if len(self._events) >= self._maxlen:
+            oldest = self._events[0][0]
+            incoming = {k: e for k, e in incoming.items() if e[0] >= oldest}
+        if not incoming:
+            return []
+        for event in incoming.values():
+            insort(self._events, event)
+            self._keys.add((event[0], event[1]))
+        dropped = self._events[:-self._maxlen] if len(self._events) > self._maxlen else []
+        for event in dropped:
+            self._keys.discard((event[0], event[1]))
+        del self._events[:len(dropped)]
+        dropped_keys = {(e[0], e[1]) for e in dropped}
+        return sorted(e for k, e in incoming.items() if k not in dropped_keys)
+
+    def as_list(self) -> List[List[str]]:
+        return [list(e) for e in self._events]
+
+def _normalize_at(at: str) -> str:
+    # Polls and pushes format the same moment differently; dedupe on UTC seconds
+    parsed = dt_util.parse_datetime(at)
+    return dt_util.as_utc(parsed).isoformat(timespec="seconds") if parsed else at
+
+class TimelineStore:
+    """Timelines of all tracked packages."""
+
+    def __init__(self) -> None:
+        self._timelines: Dict[str, PackageTimeline] = {}
+
+    def merge(self, number: str, events: List[Dict[str, Any]]) -> Tuple[List[Event], List[Event]]:
+        """Merge a fetch's events; returns (events added, events newer than anything seen before).
+
+        The second list is empty for a package's first events: that is history
+        being imported, not news.
+        """
+        tuples = [(_normalize_at(e["at"]), e["status"], e.get("detail") or e["status"]) for e in events]
+        timeline = self._timelines.get(number)
+        if timeline is None:
+            if not tuples:
+                return [], []
+            timeline = self._timelines[number] = PackageTimeline()
+            return timeline.merge(tuples), []
+        newest = timeline.newest
+        added = timeline.merge(tuples)
+        return added, [e for e in added if newest is None or e[:2] > newest[:2]]
+
+    def events(self, number: str) -> List[Dict[str, str]]:
+        timeline = self._timelines.get(number)
+        if timeline is None:
+            return []
+        return [{"at": at, "status": status, "detail": detail} for at, status, detail in timeline.as_list()]
+
+    def forget(self, number: str) -> None:
+        self._timelines.pop(number, None)
+
+    def restore(self, payload: Dict[str, List[List[str]]], numbers: Set[str]) -> None:
+        for number, events in payload.items():
+            if number in numbers:
+                self._timelines[number] = PackageTimeline(tuple(e) for e in events)
+
+    def as_dict(self) -> Dict[str, List[List[str]]]:
+        return {number: t.as_list() for number, t in self._timelines.items()}
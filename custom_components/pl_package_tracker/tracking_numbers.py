@@ -0,0 +1,50 @@
+
+from __future__ import annotations
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .const import CARRIER_DHL, CARRIER_INPOST
+
+# Checked in order; the first match wins
+CARRIER_PATTERNS = (
+    (CARRIER_INPOST, re.compile(r"\d{24}")),
+    (CARRIER_DHL, re.compile(r"JJD\d{10,}|JVGL\d{8,}|GM\d{16,}|\d{10,12}")),
+)
+
+_SEPARATORS = re.compile(r"[\s,;]+")
+_TOKEN = re.compile(r"[A-Z0-9]{8,40}")
+
+def detect_carrier(number: str) -> Optional[str]:
+    for carrier, pattern in CARRIER_PATTERNS:
+        if pattern.fullmatch(number):
+            return carrier
+    return None
+
+def parse_numbers(raw: Union[str, Iterable[str]]) -> List[str]:
+    """Split pasted text (or a list of strings) into unique, upper-cased tokens, in order."""
+    if isinstance(raw, str):
+        raw = [raw]
+    tokens = (t.upper() for chunk in raw for t in _SEPARATORS.split(chunk or ""))
+    return list(dict.fromkeys(t for t in tokens if t))
+
+def merge_packages(
+    packages: Dict[str, Any], raw: Union[str, Iterable[str]], carrier: Optional[str] = None
+) -> Tuple[List[str], List[str], List[str]]:
+    """Add the numbers in ``raw`` to ``packages`` in place.
+
+    Without ``carrier`` it is detected per number. Returns
+    ``(added, already_tracked, unrecognized)``.
+    """
+    added, existing, unrecognized = [], [], []
+    known = {n.upper() for n in packages}
+    for number in parse_numbers(raw):
+        if number in known:
+            existing.append(number)
+            continue
+        pkg_carrier = carrier or detect_carrier(number)
+        if not pkg_carrier or not _TOKEN.fullmatch(number):
+            unrecognized.append(number)
+            continue
+        packages[number] = {"carrier": pkg_carrier, "number": number, "name": ""}
+        added.append(number)
+    return added, existing, unrecognized
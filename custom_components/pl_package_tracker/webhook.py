@@ -0,0 +1,89 @@
+
+from __future__ import annotations
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from homeassistant.components import webhook
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.network import NoURLAvailableError
+from .api import parse_inpost
+from .const import DOMAIN, CONF_WEBHOOK_ID, SOURCE_PUSH
+
+_LOGGER = logging.getLogger(__name__)
+
+def _event_time(event_ts: str) -> str:
+    # ShipX sends "2024-05-06 10:12:40 +0200"
+    try:
+        return datetime.strptime(event_ts, "%Y-%m-%d %H:%M:%S %z").isoformat()
+    except ValueError:
+        return event_ts
+
+def _inpost_events(body: Any) -> List[Dict[str, Any]]:
+    """Tracking payloads in a ShipX callback.
+
+    Accepts a ShipX event (``{"event": ..., "payload": {...}}``), a bare
+    tracking object as returned by the tracking API, or a list of either.
+    """
+    items = body if isinstance(body, list) else [body]
+    out = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        payload = item.get("payload") if isinstance(item.get("payload"), dict) else item
+        if not payload.get("tracking_number"):
+            continue
+        # A status event becomes a one-entry tracking history for the timeline
+        if "tracking_details" not in payload and item.get("event_ts") and isinstance(payload.get("status"), str):
+            detail = {"status": payload["status"], "datetime": _event_time(item["event_ts"])}
+            payload = {**payload, "tracking_details": [detail]}
+        out.append(payload)
+    return out
+
+def webhook_url(hass: HomeAssistant, entry: ConfigEntry) -> Optional[str]:
+    webhook_id = entry.data.get(CONF_WEBHOOK_ID)
+    if not webhook_id:
+        return None
+    try:
+        return webhook.async_generate_url(hass, webhook_id)
+    except NoURLAvailableError:
+        return webhook.async_generate_path(webhook_id)
+
+async def _async_handle_webhook(hass: HomeAssistant, webhook_id: str, request: web.Request) -> web.Response:
+    coordinator = next(
+        (c for c in hass.data.get(DOMAIN, {}).values() if c.entry.data.get(CONF_WEBHOOK_ID) == webhook_id), None
+    )
+    if coordinator is None:
+        return web.Response(status=404)
+    try:
+        body = await request.json()
+    except ValueError:
+        return web.Response(status=400, text="invalid JSON")
+
+    events = _inpost_events(body)
+    applied = 0
+    for payload in events:
+        number = str(payload["tracking_number"]).strip()
+        if coordinator.async_push_result(parse_inpost(number, payload, SOURCE_PUSH)):
+            applied += 1
+    _LOGGER.debug("InPost push: %d of %d events applied", applied, len(events))
+    # Always 200 so the carrier doesn't retry events for packages we don't track
+    return web.Response(status=200)
+
+@callback
+def async_register_webhook(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    webhook_id = entry.data.get(CONF_WEBHOOK_ID)
+    if not webhook_id:
+        webhook_id = webhook.async_generate_id()
+        hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_WEBHOOK_ID: webhook_id})
+    webhook.async_register(
+        hass, DOMAIN, "InPost status push", webhook_id, _async_handle_webhook, allowed_methods=["POST"]
+    )
+
+@callback
+def async_unregister_webhook(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    webhook_id = entry.data.get(CONF_WEBHOOK_ID)
+    if webhook_id:
+        webhook.async_unregister(hass, webhook_id)
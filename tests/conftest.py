@@ -0,0 +1,7 @@
+"""Shared setup: the integration's modules and the stub carrier server from benchmarks/."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
@@ -0,0 +1,97 @@
+"""Browser pool runners against fake worker scripts: bad replies, spawn errors, dead runners, close."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from _common import load
+
+browser = load("browser")
+
+# Speaks the dhl_scraper.py protocol; the page URL picks the answer
+FAKE_WORKER = """
+import json, sys
+for line in sys.stdin:
+    for page in json.loads(line)["batch"]:
+        if page["url"] == "list":
+            print("[]", flush=True)
+        elif page["url"] == "hang":
+            sys.stdin.readline()
+        else:
+            print(json.dumps({"id": page["id"], "detail": "ok " + page["url"]}), flush=True)
+"""
+
+
+def run_pool(tmp_path, monkeypatch, scenario):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER)
+    monkeypatch.setattr(browser, "WORKER_SCRIPT", str(script))
+    monkeypatch.setattr(browser, "RATE_LIMIT_DHL_PAGE", (100, 100))
+
+    async def _run():
+        hass = HomeAssistant(str(tmp_path))
+        pool = browser.DhlBrowserPool(hass, size=1)
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.async_close()
+            # Let the loop reap killed workers before it closes
+            await asyncio.sleep(0.1)
+            await hass.async_stop(force=True)
+
+    return asyncio.run(_run())
+
+
+def test_bad_reply_fails_page_and_keeps_runner(tmp_path, monkeypatch):
+    async def scenario(pool):
+        with pytest.raises(browser.BrowserError):
+            await asyncio.wait_for(pool.async_scrape("list"), 10)
+        return await asyncio.wait_for(pool.async_scrape("a"), 10)
+
+    assert run_pool(tmp_path, monkeypatch, scenario) == "ok a"
+
+
+def test_spawn_error_fails_batch_and_keeps_runner(tmp_path, monkeypatch):
+    async def scenario(pool):
+        spawn = pool._async_spawn
+        calls = []
+
+        async def _flaky_spawn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("no such file")
+            return await spawn()
+
+        pool._async_spawn = _flaky_spawn
+        with pytest.raises(browser.BrowserError):
+            await asyncio.wait_for(pool.async_scrape("a"), 10)
+        return await asyncio.wait_for(pool.async_scrape("b"), 10)
+
+    assert run_pool(tmp_path, monkeypatch, scenario) == "ok b"
+
+
+def test_dead_runner_is_restarted(tmp_path, monkeypatch):
+    async def scenario(pool):
+        assert await asyncio.wait_for(pool.async_scrape("a"), 10) == "ok a"
+        (runner,) = pool._runners
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        return await asyncio.wait_for(pool.async_scrape("b"), 10)
+
+    assert run_pool(tmp_path, monkeypatch, scenario) == "ok b"
+
+
+def test_close_fails_page_in_flight(tmp_path, monkeypatch):
+    async def scenario(pool):
+        page = asyncio.ensure_future(pool.async_scrape("hang"))
+        # Until a worker has taken the page and is loading it
+        while not pool._runners or not pool._queue.empty():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        await pool.async_close()
+        return await asyncio.wait_for(asyncio.gather(page, return_exceptions=True), 1)
+
+    (outcome,) = run_pool(tmp_path, monkeypatch, scenario)
+    assert isinstance(outcome, browser.BrowserError)
@@ -0,0 +1,182 @@
+"""Coordinator merging: ticks, pushes and refreshes landing on top of each other."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+
+from _common import load
+
+api = load("api")
+browser = load("browser")
+const = load("const")
+coordinator_mod = load("coordinator")
+metrics_mod = load("metrics")
+
+PARCEL = "520113017830399002575123"
+LETTER = "JJD00000000000000000001"
+
+
+class SlowCarrier:
+    """Fake fetcher: answers with the status set for a number, each held until released."""
+
+    def __init__(self) -> None:
+        self.status = {}
+        self.gates = {}
+        self.calls = []
+
+    async def __call__(self, client, number, pool, metrics):
+        self.calls.append(number)
+        gate = self.gates.get(number)
+        if gate is not None:
+            await gate.wait()
+        return api.parse_inpost(number, {"status": self.status[number]})
+
+
+def make_coordinator(hass: HomeAssistant):
+    packages = {
+        PARCEL: {"carrier": const.CARRIER_INPOST, "number": PARCEL, "name": ""},
+        LETTER: {"carrier": const.CARRIER_DHL, "number": LETTER, "name": ""},
+    }
+    entry = SimpleNamespace(
+        entry_id="merge_test", data={}, options={const.CONF_PACKAGES: packages, const.CONF_ARCHIVE_AFTER_DAYS: 0}
+    )
+    metrics = metrics_mod.FetchMetrics()
+    coordinator = coordinator_mod.PackageDataCoordinator(hass, entry, browser.DhlBrowserPool(hass, metrics), metrics)
+    coordinator.data = {}
+    return coordinator
+
+
+def run_with_carrier(monkeypatch, tmp_path, scenario):
+    """Run ``scenario(coordinator, carrier)`` with both carriers answered by one SlowCarrier."""
+    carrier = SlowCarrier()
+    for name in (const.CARRIER_DHL, const.CARRIER_INPOST):
+        monkeypatch.setitem(coordinator_mod.CARRIER_FETCHERS, name, carrier)
+
+    async def _run():
+        hass = HomeAssistant(str(tmp_path))
+        coordinator = make_coordinator(hass)
+        try:
+            return await scenario(coordinator, carrier)
+        finally:
+            await coordinator.http.async_close()
+            await hass.async_stop(force=True)
+
+    return asyncio.run(_run())
+
+
+async def until(condition) -> None:
+    """Let the loop run until ``condition()`` holds."""
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition never became true")
+
+
+def push(coordinator, status: str) -> None:
+    assert coordinator.async_push_result(api.parse_inpost(PARCEL, {"status": status}, const.SOURCE_PUSH))
+
+
+def test_push_during_tick_survives_it(monkeypatch, tmp_path):
+    async def scenario(coordinator, carrier):
+        push(coordinator, "out_for_delivery")
+        carrier.status[LETTER] = "sent"
+        carrier.gates[LETTER] = asyncio.Event()
+        tick = asyncio.ensure_future(coordinator._async_update_data())
+        await until(lambda: carrier.calls)
+        # The pushed parcel isn't due; the tick is held up by the letter
+        assert carrier.calls == [LETTER]
+        push(coordinator, "delivered")
+        carrier.gates[LETTER].set()
+        data = await tick
+        assert data[LETTER]["status_code"] == "sent"
+        return data[PARCEL]["status_code"], coordinator.scheduler._next_due[PARCEL].year
+
+    assert run_with_carrier(monkeypatch, tmp_path, scenario) == ("delivered", 9999)
+
+
+def test_push_during_fetch_of_same_package_wins(monkeypatch, tmp_path):
+    async def scenario(coordinator, carrier):
+        carrier.status.update({PARCEL: "out_for_delivery", LETTER: "sent"})
+        carrier.gates[PARCEL] = asyncio.Event()
+        tick = asyncio.ensure_future(coordinator._async_update_data())
+        await until(lambda: PARCEL in carrier.calls)
+        push(coordinator, "delivered")
+        # The poll answers with what was true before the push
+        carrier.gates[PARCEL].set()
+        data = await tick
+        return data[PARCEL]["status_code"], coordinator.scheduler._next_due[PARCEL].year
+
+    assert run_with_carrier(monkeypatch, tmp_path, scenario) == ("delivered", 9999)
+
+
+def test_refresh_during_tick_survives_it(monkeypatch, tmp_path):
+    async def scenario(coordinator, carrier):
+        carrier.status.update({PARCEL: "out_for_delivery", LETTER: "sent"})
+        await coordinator._async_update_data()
+        # Everything due again, and polled rather than served from the last fetch
+        coordinator.scheduler._next_due.clear()
+        coordinator._flights._recent.clear()
+        carrier.gates[LETTER] = asyncio.Event()
+        tick = asyncio.ensure_future(coordinator._async_update_data())
+        flight = (const.CARRIER_INPOST, PARCEL)
+        await until(lambda: carrier.calls.count(LETTER) == 2 and flight not in coordinator._flights._inflight)
+        # The tick's parcel poll is done; a refresh afterwards brings newer news
+        coordinator._flights._recent.clear()
+        carrier.status[PARCEL] = "delivered"
+        await coordinator.async_refresh_packages([PARCEL])
+        assert coordinator.data[PARCEL]["status_code"] == "delivered"
+        carrier.gates[LETTER].set()
+        data = await tick
+        return data[PARCEL]["status_code"], coordinator.scheduler._next_due[PARCEL].year
+
+    assert run_with_carrier(monkeypatch, tmp_path, scenario) == ("delivered", 9999)
+
+
+def test_push_during_refresh_survives_it(monkeypatch, tmp_path):
+    async def scenario(coordinator, carrier):
+        carrier.status.update({PARCEL: "out_for_delivery", LETTER: "sent"})
+        carrier.gates[LETTER] = asyncio.Event()
+        refresh = asyncio.ensure_future(coordinator.async_refresh_packages([PARCEL, LETTER]))
+        await until(lambda: LETTER in carrier.calls)
+        push(coordinator, "delivered")
+        carrier.gates[LETTER].set()
+        await refresh
+        return coordinator.data[PARCEL]["status_code"], coordinator.data[LETTER]["status_code"]
+
+    assert run_with_carrier(monkeypatch, tmp_path, scenario) == ("delivered", "sent")
+
+
+def test_slow_fetch_doesnt_hold_back_the_others(monkeypatch, tmp_path):
+    async def scenario(coordinator, carrier):
+        carrier.status.update({PARCEL: "out_for_delivery", LETTER: "sent"})
+        carrier.gates[LETTER] = asyncio.Event()
+        published = []
+        coordinator.async_add_listener(lambda: published.append(set(coordinator.changed_numbers)))
+        tick = asyncio.ensure_future(coordinator._async_update_data())
+        await until(lambda: PARCEL in coordinator.data)
+        assert coordinator.data[PARCEL]["status_code"] == "out_for_delivery"
+        assert LETTER not in coordinator.data
+        carrier.gates[LETTER].set()
+        await tick
+        return published
+
+    assert run_with_carrier(monkeypatch, tmp_path, scenario) == [{PARCEL}, {LETTER}]
+
+
+def test_idle_ticks_dont_save(monkeypatch, tmp_path):
+    async def scenario(coordinator, carrier):
+        carrier.status.update({PARCEL: "out_for_delivery", LETTER: "sent"})
+        saves = []
+        monkeypatch.setattr(coordinator._store, "async_delay_save", lambda *args: saves.append(args))
+        await coordinator._async_update_data()
+        assert len(saves) == 2
+        for _ in range(5):
+            await coordinator._async_update_data()
+        assert len(saves) == 2
+        push(coordinator, "delivered")
+        return len(saves)
+
+    assert run_with_carrier(monkeypatch, tmp_path, scenario) == 3
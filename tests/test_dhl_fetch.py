@@ -0,0 +1,99 @@
+"""DHL fetch path against the stub carrier server: JSON, Chrome fallback, 304s."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from _common import load
+from stub_server import StubCarrierServer
+
+api = load("api")
+const = load("const")
+http_client = load("http_client")
+metrics_mod = load("metrics")
+
+NUMBER = "JJD00000000000000000001"
+
+
+class FakePool:
+    """Stands in for the browser pool; records the pages it was asked for."""
+
+    def __init__(self, detail: str = "Przesyłka doręczona do odbiorcy (2024-05-06 12:41)") -> None:
+        self.detail = detail
+        self.urls: list[str] = []
+
+    async def async_scrape(self, url: str) -> str:
+        self.urls.append(url)
+        return self.detail
+
+
+def run_against_stub(server: StubCarrierServer, fetches: int = 1, pool: FakePool | None = None):
+    """Fetch NUMBER ``fetches`` times through a fresh client; returns (results, pool, metrics)."""
+    pool = pool or FakePool()
+    metrics = metrics_mod.FetchMetrics()
+
+    async def _run():
+        await server.start()
+        server.point_integration_here(api)
+        client = http_client.CarrierHttpClient(None, metrics)
+        try:
+            return [await api.fetch_dhl(client, NUMBER, pool, metrics) for _ in range(fetches)]
+        finally:
+            await client.async_close()
+            await server.close()
+
+    return asyncio.run(_run()), pool, metrics
+
+
+def test_parse_dhl_json():
+    detail, events = api._parse_dhl_json({"shipments": [{
+        "status": {"statusCode": "transit", "description": " W tranzycie ", "timestamp": "2024-05-06T10:12:00"},
+        "events": [{"statusCode": "transit", "description": "W tranzycie", "timestamp": "2024-05-06T10:12:00"}],
+    }]})
+    assert detail == "W tranzycie (2024-05-06T10:12:00)"
+    assert events == [{"at": "2024-05-06T10:12:00", "status": "transit", "detail": "W tranzycie"}]
+
+
+@pytest.mark.parametrize("data", [None, [], {}, {"shipments": []}, {"shipments": [{"status": {}}]}])
+def test_parse_dhl_json_unusable(data):
+    assert api._parse_dhl_json(data) is None
+
+
+def test_json_ok():
+    (result,), pool, metrics = run_against_stub(StubCarrierServer())
+    assert result["source"] == const.SOURCE_HTTP
+    assert result["detail"] == "Przesyłka przekazana kurierowi do doręczenia (2024-05-06T10:12:00)"
+    assert result["short"] == const.SHORT_OUT_FOR_DELIVERY
+    assert len(result["events"]) == 1
+    assert pool.urls == []
+    assert metrics.counter(const.CARRIER_DHL, metrics_mod.COUNT_FALLBACKS) == 0
+
+
+def test_forbidden_falls_back_to_browser():
+    (result,), pool, metrics = run_against_stub(StubCarrierServer(dhl_json=False))
+    assert result["source"] == const.SOURCE_BROWSER
+    assert result["detail"] == pool.detail
+    assert result["short"] == const.SHORT_DELIVERED
+    assert result["events"] == []
+    assert pool.urls == [api.DHL_URL.format(number=NUMBER)]
+    assert metrics.counter(const.CARRIER_DHL, metrics_mod.COUNT_FALLBACKS) == 1
+
+
+def test_unavailable_raises_without_browser():
+    pool = FakePool()
+    with pytest.raises(api.CarrierError):
+        run_against_stub(StubCarrierServer(error_rate=1.0), pool=pool)
+    assert pool.urls == []
+
+
+def test_not_modified_reuses_last_result():
+    server = StubCarrierServer()
+    (first, second), pool, metrics = run_against_stub(server, fetches=2)
+    assert server.requests["dhl_json_not_modified"] == 1
+    assert metrics.counter(const.CARRIER_DHL, metrics_mod.COUNT_NOT_MODIFIED) == 1
+    assert second["source"] == const.SOURCE_HTTP
+    assert (second["detail"], second["short"]) == (first["detail"], first["short"])
+    # Its events were delivered with the 200 already
+    assert first["events"] and second["events"] == []
+    assert pool.urls == []
@@ -0,0 +1,86 @@
+"""Recorded InPost ShipX callbacks applied through the webhook parsing and the coordinator."""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+# Loading the webhook component needs these imported first
+import homeassistant.core  # noqa: F401
+from homeassistant.components import persistent_notification  # noqa: F401
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from _common import FIXTURES, load
+
+api = load("api")
+browser = load("browser")
+const = load("const")
+coordinator_mod = load("coordinator")
+metrics_mod = load("metrics")
+webhook = load("webhook")
+
+NUMBER = "520113017830399002575123"
+EXPECTED = [
+    ("adopted_at_sorting_center", "Przyjęta w Sortowni", const.SHORT_IN_TRANSIT, False),
+    ("out_for_delivery", "Przekazano do doręczenia", const.SHORT_OUT_FOR_DELIVERY, False),
+    ("ready_to_pickup", "Umieszczona w automacie Paczkomat", const.SHORT_IN_TRANSIT, False),
+    ("delivered", "Dostarczona", const.SHORT_DELIVERED, True),
+]
+
+
+def test_inpost_events_unwraps_callbacks():
+    body = json.loads((FIXTURES / "inpost_push.json").read_text(encoding="utf-8"))
+    payloads = webhook._inpost_events(body)
+    assert [p["status"] for p in payloads] == [status for status, *_ in EXPECTED]
+    assert payloads[0]["tracking_details"] == [
+        {"status": "adopted_at_sorting_center", "datetime": "2024-05-06T08:02:11+02:00"}
+    ]
+    # A bare tracking object passes through; junk is skipped
+    assert webhook._inpost_events({"tracking_number": NUMBER, "status": "delivered"}) == [
+        {"tracking_number": NUMBER, "status": "delivered"}
+    ]
+    assert webhook._inpost_events([1, {"event": "x", "payload": {}}]) == []
+
+
+def test_recorded_pushes_update_package_and_schedule(tmp_path):
+    body = json.loads((FIXTURES / "inpost_push.json").read_text(encoding="utf-8"))
+
+    async def _run():
+        hass = HomeAssistant(str(tmp_path))
+        packages = {NUMBER: {"carrier": const.CARRIER_INPOST, "number": NUMBER, "name": ""}}
+        entry = SimpleNamespace(
+            entry_id="push_test", data={}, options={const.CONF_PACKAGES: packages, const.CONF_ARCHIVE_AFTER_DAYS: 0}
+        )
+        metrics = metrics_mod.FetchMetrics()
+        pool = browser.DhlBrowserPool(hass, metrics)
+        coordinator = coordinator_mod.PackageDataCoordinator(hass, entry, pool, metrics)
+        coordinator.data = {}
+        seen = []
+        try:
+            for payload, (status, detail, short, final) in zip(webhook._inpost_events(body), EXPECTED):
+                before = dt_util.utcnow()
+                assert coordinator.async_push_result(api.parse_inpost(NUMBER, payload, const.SOURCE_PUSH))
+                result = coordinator.data[NUMBER]
+                seen.append((result["status_code"], result["detail"], result["short"], result["final"]))
+                assert result["source"] == const.SOURCE_PUSH
+                assert NUMBER in coordinator.scheduler.pushed()
+                next_due = coordinator.scheduler._next_due[NUMBER]
+                if final:
+                    # Delivered: never polled again
+                    assert next_due.year == 9999
+                else:
+                    # Pushed packages are only polled as a safety net
+                    assert next_due - before >= timedelta(minutes=const.POLL_PUSH_SAFETY_MIN)
+
+            assert [e["status"] for e in coordinator.timelines.events(NUMBER)] == [s for s, *_ in EXPECTED]
+            # Not tracked, or tracked under another carrier: ignored
+            other = api.parse_inpost("520000000000000000000000", {"status": "delivered"}, const.SOURCE_PUSH)
+            assert not coordinator.async_push_result(other)
+        finally:
+            await coordinator.http.async_close()
+            await hass.async_stop(force=True)
+        return seen
+
+    assert asyncio.run(_run()) == EXPECTED
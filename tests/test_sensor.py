@@ -0,0 +1,103 @@
+"""Package entities through a real config entry setup: options changes and the entity registry."""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+from homeassistant import config_entries, loader
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import area_registry, device_registry, entity, entity_registry
+
+from _common import ROOT
+
+DOMAIN = "pl_package_tracker"
+NUMBER = "520113017830399002575123"
+
+
+def fake_fetcher(carrier: str):
+    async def _fetch(client, number, pool, metrics):
+        return {"carrier": carrier, "number": number, "detail": "Nadana", "short": "In transit", "source": "http"}
+    return _fetch
+
+
+async def setup_entry(hass: HomeAssistant, packages: dict) -> config_entries.ConfigEntry:
+    """Set the integration up the way Home Assistant does, minus the HTTP server."""
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    entity.async_setup(hass)
+    await area_registry.async_load(hass)
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    # Webhooks only need their handler registry
+    hass.config.components.update({"http", "webhook"})
+    entry = config_entries.ConfigEntry(
+        version=1, minor_version=1, domain=DOMAIN, title="test", data={}, source="user",
+        options={"packages": packages},
+    )
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.LOADED
+    return entry
+
+
+def run_setup(tmp_path, monkeypatch, scenario):
+    os.symlink(ROOT / "custom_components", tmp_path / "custom_components")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [m for m in sys.modules if m == "custom_components" or m.startswith("custom_components.")]:
+        monkeypatch.delitem(sys.modules, name)
+
+    async def _run():
+        hass = HomeAssistant(str(tmp_path))
+        from custom_components.pl_package_tracker import api
+
+        for carrier in ("dhl", "inpost"):
+            monkeypatch.setitem(api.CARRIER_FETCHERS, carrier, fake_fetcher(carrier))
+        try:
+            return await scenario(hass)
+        finally:
+            await hass.async_stop(force=True)
+
+    return asyncio.run(_run())
+
+
+def package_unique_ids(hass: HomeAssistant, entry) -> set[str]:
+    ent_reg = entity_registry.async_get(hass)
+    return {
+        e.unique_id for e in entity_registry.async_entries_for_config_entry(ent_reg, entry.entry_id)
+        if NUMBER in e.unique_id
+    }
+
+
+def test_carrier_change_removes_old_registry_entries(tmp_path, monkeypatch):
+    async def scenario(hass):
+        entry = await setup_entry(hass, {NUMBER: {"carrier": "inpost", "number": NUMBER, "name": ""}})
+        before = package_unique_ids(hass, entry)
+        hass.config_entries.async_update_entry(
+            entry, options={"packages": {NUMBER: {"carrier": "dhl", "number": NUMBER, "name": ""}}}
+        )
+        await hass.async_block_till_done()
+        return before, package_unique_ids(hass, entry)
+
+    before, after = run_setup(tmp_path, monkeypatch, scenario)
+    assert len(before) == 3 and all("_inpost_" in u for u in before)
+    assert len(after) == 3 and all("_dhl_" in u for u in after)
+
+
+def test_rename_keeps_registry_entries(tmp_path, monkeypatch):
+    async def scenario(hass):
+        entry = await setup_entry(hass, {NUMBER: {"carrier": "inpost", "number": NUMBER, "name": ""}})
+        ent_reg = entity_registry.async_get(hass)
+        before = {e.entity_id for e in entity_registry.async_entries_for_config_entry(ent_reg, entry.entry_id)}
+        hass.config_entries.async_update_entry(
+            entry, options={"packages": {NUMBER: {"carrier": "inpost", "number": NUMBER, "name": "Shoes"}}}
+        )
+        await hass.async_block_till_done()
+        after = {e.entity_id for e in entity_registry.async_entries_for_config_entry(ent_reg, entry.entry_id)}
+        return before, after
+
+    before, after = run_setup(tmp_path, monkeypatch, scenario)
+    assert before == after
@@ -0,0 +1,74 @@
+"""Package timelines: dedupe, ordering, the cap and which events count as fresh."""
+from __future__ import annotations
+
+from _common import load
+
+const = load("const")
+timeline = load("timeline")
+
+NUMBER = "520113017830399002575123"
+
+
+def event(at: str, status: str) -> dict:
+    return {"at": at, "status": status, "detail": status}
+
+
+def test_dedupes_on_normalized_timestamps():
+    store = timeline.TimelineStore()
+    added, _ = store.merge(NUMBER, [event("2024-05-06T08:02:11+02:00", "adopted_at_sorting_center")])
+    assert added == [("2024-05-06T06:02:11+00:00", "adopted_at_sorting_center", "adopted_at_sorting_center")]
+    # The same moment as a poll formats it, and with sub-second precision
+    for at in ("2024-05-06T06:02:11Z", "2024-05-06T06:02:11.250+00:00"):
+        assert store.merge(NUMBER, [event(at, "adopted_at_sorting_center")]) == ([], [])
+    assert len(store.events(NUMBER)) == 1
+
+
+def test_poll_after_push_slots_older_history_in_before_it():
+    store = timeline.TimelineStore()
+    store.merge(NUMBER, [event("2024-05-06T08:00:00Z", "confirmed")])
+    # Pushed: the parcel is out for delivery
+    added, fresh = store.merge(NUMBER, [event("2024-05-07T07:30:00Z", "out_for_delivery")])
+    assert [e[1] for e in fresh] == ["out_for_delivery"]
+    # A poll then brings the whole history, including a step the push skipped
+    added, fresh = store.merge(NUMBER, [
+        event("2024-05-06T08:00:00Z", "confirmed"),
+        event("2024-05-06T20:00:00Z", "adopted_at_sorting_center"),
+        event("2024-05-07T07:30:00Z", "out_for_delivery"),
+    ])
+    assert [e[1] for e in added] == ["adopted_at_sorting_center"]
+    assert fresh == []
+    assert [e["status"] for e in store.events(NUMBER)] == ["confirmed", "adopted_at_sorting_center", "out_for_delivery"]
+
+
+def test_full_timeline_ignores_events_older_than_the_oldest_kept():
+    t = timeline.PackageTimeline(maxlen=3)
+    history = [(f"2024-05-0{day}T08:00:00+00:00", f"s{day}", f"s{day}") for day in range(1, 6)]
+    assert t.merge(history) == history[2:]
+    # Re-fetching the long history adds nothing, evicted events included
+    assert t.merge(history) == []
+    assert t.as_list() == [list(e) for e in history[2:]]
+    # A newer event still gets in, evicting the oldest
+    newer = ("2024-05-06T08:00:00+00:00", "s6", "s6")
+    assert t.merge([newer]) == [newer]
+    assert [e[1] for e in t.as_list()] == ["s4", "s5", "s6"]
+    # An event inside the kept range is still inserted in order
+    between = ("2024-05-04T12:00:00+00:00", "s4b", "s4b")
+    assert t.merge([between]) == [between]
+    assert [e[1] for e in t.as_list()] == ["s4b", "s5", "s6"]
+
+
+def test_fresh_only_reports_events_newer_than_previous_newest():
+    store = timeline.TimelineStore()
+    # A package's first events are history being imported, not news
+    added, fresh = store.merge(NUMBER, [
+        event("2024-05-06T08:00:00Z", "confirmed"),
+        event("2024-05-06T20:00:00Z", "sorted"),
+    ])
+    assert len(added) == 2 and fresh == []
+    added, fresh = store.merge(NUMBER, [
+        event("2024-05-06T12:00:00Z", "in_transit"),
+        event("2024-05-07T07:30:00Z", "out_for_delivery"),
+    ])
+    assert [e[1] for e in added] == ["in_transit", "out_for_delivery"]
+    assert [e[1] for e in fresh] == ["out_for_delivery"]
+    assert store.merge(NUMBER, []) == ([], [])